@@ -0,0 +1 @@
+# VOC与COCO数据集一致性检查模块
\ No newline at end of file
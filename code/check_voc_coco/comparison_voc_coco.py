@@ -5,21 +5,25 @@ VOC与COCO格式数据集一致性检查类
 包括训练集、验证集和测试集的文件分配对应关系。
 """
 
+import os
 import json
-import xml.etree.ElementTree as ET
 from pathlib import Path
 from typing import Dict, List, Set, Tuple
-import sys
 
-# 导入日志系统和全局变量
-sys.path.append(str(Path(__file__).parent.parent))
-from logger_code.logger_sys import get_logger
-from global_var.global_cls import *
+# 导入日志系统和全局变量（通过code包导入，在项目根目录下以 python -m code.check_voc_coco.comparison_voc_coco 运行）
+from code.logger_code.logger_sys import get_logger
+from code.global_var.global_cls import *
+
+# 项目根目录，用于定位示例数据集，与运行时的工作目录无关
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # 获取当前文件名作为日志标识
 current_filename = Path(__file__).stem
 logger = get_logger(current_filename)
 
+# 设置环境变量VOC_TRACE=1时才在异常时输出完整堆栈
+VERBOSE = bool(int(os.environ.get('VOC_TRACE', '0')))
+
 
 class VOCCOCOComparison:
     """VOC与COCO格式数据集一致性检查类"""
@@ -108,7 +112,7 @@ class VOCCOCOComparison:
                         
                         if file_stem:
                             file_names.add(file_stem)
-        except Exception as e:
+        except (OSError, UnicodeDecodeError) as e:
             logger.error(f"读取VOC划分文件失败: {split_file} - {e}")
             return set()
         
@@ -146,7 +150,8 @@ class VOCCOCOComparison:
             logger.debug(f"COCO {split} 划分: {len(file_names)} 个文件")
             return file_names
             
-        except Exception as e:
+        except (OSError, ValueError) as e:
+            # JSON格式错误和编码错误均为ValueError的子类
             logger.error(f"读取COCO文件失败: {coco_file} - {e}")
             return set()
     
@@ -412,7 +417,7 @@ class VOCCOCOComparison:
 def main():
     """测试函数"""
     # 测试数据集路径
-    dataset_path = "../../dataset/Fruit"
+    dataset_path = os.path.join(project_root, "dataset", "Fruit")
     
     try:
         # 创建比较器
@@ -432,11 +437,15 @@ def main():
             inconsistencies = comparator.get_inconsistencies()
             print(f"不一致的划分数: {len(inconsistencies)}")
         
-    except Exception as e:
+    except (OSError, ValueError) as e:
+        # 只处理数据集缺失、文件损坏等预期错误，其他异常带完整堆栈直接抛出
         logger.error(f"比较过程中出错: {e}")
         print(f"❌ 比较失败: {e}")
-        import traceback
-        traceback.print_exc()
+        if VERBOSE:
+            import traceback
+            traceback.print_exc()
+        else:
+            print("  (设置环境变量 VOC_TRACE=1 可查看完整堆栈)")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,34 @@
+"""
+JSON序列化后端
+
+优先使用orjson（C实现，直接输出UTF-8字节），未安装时回退到标准库json；
+orjson为可选依赖，可通过 pip install paddle-format[fast] 安装
+"""
+
+import json
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def dump_json(data, json_path, indent: bool = True):
+    """
+    将数据写入JSON文件，UTF-8编码且不转义非ASCII字符
+
+    Args:
+        data: 需要序列化的数据
+        json_path: 目标文件路径
+        indent: 是否使用2空格缩进
+    """
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        with open(json_path, 'wb') as f:
+            f.write(orjson.dumps(data, option=option))
+    else:
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2 if indent else None, ensure_ascii=False)
@@ -0,0 +1,178 @@
+"""
+XML解析后端
+
+按解析速度依次选择可用的XML库：
+- lxml（基于libxml2的C实现，首选）
+- xml.etree.cElementTree（旧版本Python中的C加速实现）
+- xml.etree.ElementTree（标准库）
+
+统一导出ET，以及屏蔽各后端差异的解析、流式解析和保存函数；
+lxml为可选依赖，可通过 pip install paddle-format[fast] 安装
+"""
+
+import io
+import os
+import mmap
+
+try:
+    from lxml import etree as ET
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+    try:
+        import xml.etree.cElementTree as ET
+    except ImportError:
+        import xml.etree.ElementTree as ET
+
+# 小于该大小的文件直接由解析器读取，内存映射按页对齐的开销超过省去的拷贝
+MMAP_MIN_SIZE = 4096
+
+# XML解析后端名称，用于日志输出
+XML_BACKEND_NAME = 'lxml' if LXML_AVAILABLE else ET.__name__
+
+
+def _lxml_parser():
+    """
+    创建lxml解析器
+
+    保留空白以保持原有格式；VOC标注不使用ID属性，关闭ID收集省去维护ID哈希表的开销
+    """
+    return ET.XMLParser(remove_blank_text=False, huge_tree=True, collect_ids=False)
+
+
+def parse_xml(xml_path):
+    """
+    解析XML文件，保留原有的空白和缩进
+
+    lxml的解析器不是线程安全的，每次调用创建独立的解析器；
+    较大的文件通过mmap映射后直接从页缓存解析，省去一次读入用户态缓冲区的拷贝
+
+    Args:
+        xml_path: XML文件路径
+
+    Returns:
+        解析后的ElementTree
+    """
+    xml_path = str(xml_path)
+    if os.path.getsize(xml_path) >= MMAP_MIN_SIZE:
+        with open(xml_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if LXML_AVAILABLE:
+                return ET.fromstring(mm, _lxml_parser()).getroottree()
+            parser = ET.XMLParser()
+            parser.feed(mm)
+            return ET.ElementTree(parser.close())
+
+    if LXML_AVAILABLE:
+        return ET.parse(xml_path, parser=_lxml_parser())
+    return ET.parse(xml_path)
+
+
+def iterparse_xml(xml_path, events=('end',)):
+    """
+    创建XML流式解析迭代器
+
+    迭代结束后可通过迭代器的root属性获取根元素
+
+    Args:
+        xml_path: XML文件路径或已打开的二进制文件对象
+        events: 需要产出的解析事件
+
+    Returns:
+        产出(event, elem)的迭代器
+    """
+    source = xml_path if hasattr(xml_path, 'read') else str(xml_path)
+    if LXML_AVAILABLE:
+        return ET.iterparse(source, events=events, huge_tree=True, collect_ids=False)
+    return ET.iterparse(source, events=events)
+
+
+def iterparse_tag(xml_path, tag: str):
+    """
+    流式解析XML文件，逐个产出指定标签的元素
+
+    元素在其结束标签处产出，调用方处理完后应调用elem.clear()释放内存
+
+    Args:
+        xml_path: XML文件路径
+        tag: 需要产出的标签名
+
+    Yields:
+        指定标签的元素
+    """
+    if LXML_AVAILABLE:
+        for _, elem in ET.iterparse(str(xml_path), events=('end',), tag=tag, huge_tree=True, collect_ids=False):
+            yield elem
+    else:
+        for _, elem in ET.iterparse(str(xml_path), events=('end',)):
+            if elem.tag == tag:
+                yield elem
+
+
+def remove_element(parent, elem):
+    """
+    从父元素中移除子元素，并保持剩余内容的缩进
+
+    被移除元素的尾部空白是其后兄弟元素（或父元素结束标签）前的缩进，移交给前一个兄弟元素的尾部
+    （没有前一个兄弟元素时交给父元素的文本），否则移除最后一个子元素后父元素的结束标签会错位
+
+    Args:
+        parent: 父元素
+        elem: 需要移除的子元素
+    """
+    if LXML_AVAILABLE:
+        previous = elem.getprevious()
+    else:
+        children = list(parent)
+        index = children.index(elem)
+        previous = children[index - 1] if index > 0 else None
+
+    if previous is not None:
+        previous.tail = elem.tail
+    else:
+        parent.text = elem.tail
+    parent.remove(elem)
+
+
+def write_xml(tree, target_path, encoding: str = 'utf-8'):
+    """
+    保存XML文件并保持原有格式（换行和缩进）
+
+    解析时保留了原有空白，直接序列化即可保持格式；lxml额外补齐缺失的缩进。
+    标准库后端按lxml的格式写出XML声明（编码名大写）和根元素后的换行，两种后端输出一致
+
+    Args:
+        tree: 需要保存的ElementTree
+        target_path: 目标文件路径或已打开的二进制文件对象
+        encoding: 文件编码
+    """
+    if LXML_AVAILABLE:
+        target = target_path if hasattr(target_path, 'write') else str(target_path)
+        tree.write(target, pretty_print=True, xml_declaration=True, encoding=encoding)
+        return
+
+    declaration = f"<?xml version='1.0' encoding='{encoding.upper()}'?>\n".encode(encoding)
+    if hasattr(target_path, 'write'):
+        target_path.write(declaration)
+        tree.write(target_path, xml_declaration=False, encoding=encoding)
+        target_path.write(b'\n')
+    else:
+        with open(str(target_path), 'wb') as f:
+            f.write(declaration)
+            tree.write(f, xml_declaration=False, encoding=encoding)
+            f.write(b'\n')
+
+
+def serialize_xml(tree, encoding: str = 'utf-8') -> bytes:
+    """
+    将ElementTree序列化为字节，内容与write_xml写入文件的完全一致
+
+    Args:
+        tree: 需要序列化的ElementTree
+        encoding: 编码
+
+    Returns:
+        序列化后的XML字节
+    """
+    buffer = io.BytesIO()
+    write_xml(tree, buffer, encoding)
+    return buffer.getvalue()
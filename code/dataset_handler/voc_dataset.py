@@ -13,28 +13,395 @@ VOC数据集处理类
 """
 
 import os
-import xml.etree.ElementTree as ET
+import io
+import re
+import json
+import queue
+import hashlib
+from functools import lru_cache
+from collections import namedtuple, Counter
 from pathlib import Path
-from typing import List, Tuple, Set, Dict
-import sys
+from typing import List, Tuple, Set, Dict, Optional
 import random
 import shutil
+import struct
 import cv2
 from tqdm import tqdm
 import numpy as np
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
 import threading
-from xml.dom import minidom
 
-# 导入日志系统 - 使用全局变量
-sys.path.append(str(Path(__file__).parent.parent))
-from logger_code.logger_sys import get_logger
-from global_var.global_cls import *
+# 导入日志系统 - 使用全局变量（包内相对导入，无需修改sys.path）
+from ..logger_code.logger_sys import get_logger
+from ..global_var.global_cls import *
+from ._xml_backend import (ET, XML_BACKEND_NAME, parse_xml, iterparse_xml, iterparse_tag, remove_element,
+                           write_xml, serialize_xml)
+from ._json_backend import dump_json
+from .yolo_series_dataset import file_suffix
 
 # 获取当前文件名作为日志标识
 current_filename = Path(__file__).stem
 logger = get_logger(current_filename)
 
+
+def _to_label_set(labels) -> frozenset:
+    """将标签列表统一转换为字符串frozenset，使每个object的标签判断为O(1)"""
+    return frozenset(map(str, labels)) if labels else frozenset()
+
+
+# XML标签（开始、结束和自闭合），属性值中允许出现'>'；用于跳过解析时按层级统计object数量，
+# 只在内容不含注释、CDATA、处理指令时使用，此时每个'<'都是标签的开始
+_TAG_PATTERN = re.compile(rb'<(/?)([^\s/>]+)(?:[^>"\']|"[^"]*"|\'[^\']*\')*?(/?)>')
+
+
+def metadata_fingerprint(entries, prefix: bytes = b'') -> str:
+    """
+    根据文件元数据计算指纹
+    
+    对按文件名排序的(文件名, 大小, 纳秒修改时间)序列做blake2b摘要，文件名后附加空字节分隔，
+    大小和修改时间按定长二进制打包；只使用元数据，不读取文件内容，任一文件增删、改名或修改都会改变指纹
+    
+    Args:
+        entries: 按文件名排序的(文件名, 大小, 纳秒修改时间)序列
+        prefix: 先于文件元数据参与摘要的附加内容（如筛选条件）
+    
+    Returns:
+        32位十六进制指纹
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    if prefix:
+        digest.update(prefix)
+    for name, size, mtime in entries:
+        digest.update(name.encode(DEFAULT_ENCODING) + b'\0')
+        digest.update(struct.pack('<qq', size, mtime))
+    return digest.hexdigest()
+
+
+def _count_top_level_objects(xml_bytes: bytes) -> int:
+    """
+    不构建元素树，按标签层级统计根元素下直接子元素object的数量
+    
+    与_filter_xml_bytes解析路径的统计口径一致（只统计深度为1的object，嵌套的object不计入）；
+    调用方需保证内容中没有注释、CDATA和处理指令
+    """
+    body = xml_bytes[xml_bytes.find(b'?>') + 2:] if xml_bytes.startswith(b'<?xml') else xml_bytes
+    depth = 0
+    count = 0
+    for closing, tag, self_closing in _TAG_PATTERN.findall(body):
+        if closing:
+            depth -= 1
+            continue
+        if depth == 1 and tag == b'object':
+            count += 1
+        if not self_closing:
+            depth += 1
+    return count
+
+
+@lru_cache(maxsize=32)
+def _label_needles(labels: frozenset) -> Tuple[bytes, ...]:
+    """将标签集合编码为用于字节查找的UTF-8字节串，同一标签集合只编码一次"""
+    return tuple(label.encode('utf-8') for label in labels if label)
+
+
+def _may_contain_labels(xml_bytes: bytes, labels: frozenset) -> bool:
+    """
+    不解析XML，按字节查找判断内容中是否可能出现指定标签
+    
+    object的标签名去除首尾空白后与标签完全相等时，标签文本必然原样出现在内容中，
+    因此查找不到任何标签即可证明没有object匹配；内容不是UTF-8编码，或含有实体/字符引用
+    （如A&amp;B）、CDATA、注释、处理指令等可能改变文本字节形式的结构时，无法按字节证明，
+    保守地返回True
+    
+    Args:
+        xml_bytes: XML文件内容
+        labels: 标签集合
+    
+    Returns:
+        是否可能包含指定标签
+    """
+    if xml_bytes.startswith(b'<?xml'):
+        declaration = xml_bytes[:xml_bytes.find(b'?>')].lower()
+        if b'encoding' in declaration and not any(
+                codec in declaration for codec in (b'utf-8', b'utf8', b'ascii')):
+            return True
+    elif not xml_bytes.lstrip().startswith(b'<'):
+        # 带BOM或UTF-16等编码的内容
+        return True
+    
+    # 跳过开头的XML声明后，文本必须是字面字节，不能经过转义或被其他结构拆分
+    body = xml_bytes[xml_bytes.find(b'?>') + 2:] if xml_bytes.startswith(b'<?xml') else xml_bytes
+    if b'&' in body or b'<!' in body or b'<?' in body:
+        return True
+    
+    return any(needle in xml_bytes for needle in _label_needles(labels))
+
+
+def _filter_xml_bytes(xml_bytes: bytes, xml_name: str, include_labels, exclude_labels) -> Dict:
+    """
+    过滤XML内容中的指定标签，返回保持原有格式的序列化结果
+    
+    模块级函数，只处理内存中的字节，不访问磁盘，可作为流水线的计算阶段被进程池调用；
+    使用iterparse流式解析，被过滤的object在解析到时立即移除并清空，不在内存中累积；
+    保留模式下先按字节预检查，内容中不含任何保留标签的文件过滤后必然为空，直接跳过解析
+    
+    Args:
+        xml_bytes: XML文件内容
+        xml_name: XML文件名（用于日志）
+        include_labels: 需要保留的标签集合（非空时只保留这些标签）
+        exclude_labels: 需要排除的标签集合
+        
+    Returns:
+        {'is_valid': 是否仍有有效对象, 'removed_count': 移除的对象数,
+         'xml_bytes': 过滤后的XML内容（无效时为None）}，处理失败时返回None
+    """
+    try:
+        # 保留模式下内容中查找不到任何保留标签时，所有object都会被移除，无需解析
+        if include_labels and not _may_contain_labels(xml_bytes, include_labels):
+            object_count = _count_top_level_objects(xml_bytes)
+            if object_count == 0:
+                logger.warning(f"发现空标注文件: {xml_name}")
+                return {'is_valid': False, 'removed_count': 0, 'xml_bytes': None}
+            logger.warning(f"过滤后无有效对象: {xml_name}")
+            return {'is_valid': False, 'removed_count': object_count, 'xml_bytes': None}
+        
+        # 流式解析XML内容，只处理根元素下的object标签
+        context = iterparse_xml(io.BytesIO(xml_bytes), events=('start', 'end'))
+        
+        # include_labels非空时为保留模式，否则为排除模式，每个object只做一次集合查找
+        keep_mode = bool(include_labels)
+        filter_labels = include_labels if keep_mode else exclude_labels
+        filter_reason = "不在保留列表中" if keep_mode else "在排除列表中"
+        
+        root = None
+        depth = 0
+        object_count = 0
+        removed_count = 0
+        
+        for event, obj in context:
+            if event == 'start':
+                if root is None:
+                    root = obj
+                depth += 1
+                continue
+            
+            depth -= 1
+            if depth != 1 or obj.tag != 'object':
+                continue
+            
+            object_count += 1
+            name_elem = obj.find('name')
+            should_remove = False
+            
+            if name_elem is not None and name_elem.text:
+                label_name = name_elem.text.strip()
+                
+                # 保留模式下不在集合中、排除模式下在集合中的标签需要移除
+                if filter_labels and (label_name in filter_labels) != keep_mode:
+                    should_remove = True
+                    logger.debug(f"移除标签 '{label_name}' ({filter_reason}) 从文件 {xml_name}")
+            else:
+                # 移除无效的object标签
+                should_remove = True
+                logger.debug(f"移除无效object标签 从文件 {xml_name}")
+            
+            if should_remove:
+                remove_element(root, obj)
+                obj.clear()
+                removed_count += 1
+        
+        if object_count == 0:
+            # 空标注文件，不复制到输出目录
+            logger.warning(f"发现空标注文件: {xml_name}")
+            return {'is_valid': False, 'removed_count': 0, 'xml_bytes': None}
+        
+        # 检查过滤后是否还有有效对象
+        if removed_count == object_count:
+            logger.warning(f"过滤后无有效对象: {xml_name}")
+            return {'is_valid': False, 'removed_count': removed_count, 'xml_bytes': None}
+        
+        if removed_count > 0:
+            logger.info(f"过滤XML文件: {xml_name} -> 移除 {removed_count} 个对象")
+        
+        # 有效标注文件，序列化过滤后的XML，保持原有格式
+        return {'is_valid': True, 'removed_count': removed_count,
+                'xml_bytes': serialize_xml(ET.ElementTree(root))}
+            
+    except Exception as e:
+        logger.error(f"处理XML文件失败: {xml_name} - {e}")
+        return None
+
+
+# 进程池工作进程中的标签过滤条件，由_init_label_filter在进程启动时设置一次
+_worker_include_labels = frozenset()
+_worker_exclude_labels = frozenset()
+
+
+def _init_label_filter(include_labels, exclude_labels):
+    """进程池初始化函数：每个工作进程只接收一次过滤条件，任务中不再重复序列化"""
+    global _worker_include_labels, _worker_exclude_labels
+    _worker_include_labels = include_labels
+    _worker_exclude_labels = exclude_labels
+
+
+def _filter_xml_bytes_in_worker(xml_bytes: bytes, xml_name: str) -> Dict:
+    """使用工作进程中预先设置的过滤条件过滤XML内容"""
+    return _filter_xml_bytes(xml_bytes, xml_name, _worker_include_labels, _worker_exclude_labels)
+
+
+def _read_voc_annotation(xml_path) -> Tuple[Optional[Tuple[str, str, str]], List[Tuple[str, Optional[Tuple[str, str, str, str]]]]]:
+    """
+    流式读取VOC标注文件中的图像尺寸和目标信息
+    
+    size和object在结束标签处提取所需文本后立即清空，解析过程中不保留完整的DOM树
+    
+    Args:
+        xml_path: XML文件路径
+        
+    Returns:
+        (size, objects)：size为(width, height, depth)文本元组，缺少size标签时为None；
+        objects为(name, bndbox)列表，bndbox为(xmin, ymin, xmax, ymax)文本元组，缺少bndbox时为None
+    """
+    size = None
+    objects = []
+    for _, elem in iterparse_xml(xml_path):
+        tag = elem.tag
+        if tag == 'size':
+            size = (elem.findtext('width'), elem.findtext('height'), elem.findtext('depth'))
+            elem.clear()
+        elif tag == 'object':
+            bndbox = elem.find('bndbox')
+            if bndbox is not None:
+                bndbox = (bndbox.findtext('xmin'), bndbox.findtext('ymin'),
+                          bndbox.findtext('xmax'), bndbox.findtext('ymax'))
+            objects.append((elem.findtext('name'), bndbox))
+            elem.clear()
+    return size, objects
+
+
+def _iter_object_names(xml_path):
+    """
+    流式产出XML文件中每个object的类别名
+    
+    object在结束标签处取出name后立即清空，缺少name或name为空的object被跳过
+    
+    Args:
+        xml_path: XML文件路径
+        
+    Yields:
+        去除首尾空白的类别名
+    """
+    for obj in iterparse_tag(xml_path, 'object'):
+        name = obj.findtext('name')
+        obj.clear()
+        if name:
+            yield name.strip()
+
+
+def _clean_one_xml(in_path, out_path, include_labels, exclude_labels) -> Dict:
+    """
+    清洗单个XML文件：过滤指定标签，保持原有格式保存到输出路径
+    
+    模块级函数，不依赖实例状态，可被进程池序列化调用
+    
+    Args:
+        in_path: 输入XML文件路径
+        out_path: 输出XML文件路径
+        include_labels: 需要保留的标签集合（非空时只保留这些标签）
+        exclude_labels: 需要排除的标签集合
+        
+    Returns:
+        {'is_valid': 是否仍有有效对象, 'removed_count': 移除的对象数}，处理失败时返回None
+    """
+    xml_name = os.path.basename(str(in_path))
+    try:
+        with open(in_path, 'rb') as f:
+            xml_bytes = f.read()
+    except OSError as e:
+        logger.error(f"处理XML文件失败: {xml_name} - {e}")
+        return None
+    
+    result = _filter_xml_bytes(xml_bytes, xml_name, include_labels, exclude_labels)
+    if result is None:
+        return None
+    
+    if result['is_valid']:
+        # 有效标注文件，保存过滤后的XML文件到输出目录
+        try:
+            with open(out_path, 'wb') as f:
+                f.write(result['xml_bytes'])
+        except OSError as e:
+            logger.error(f"保存XML文件失败: {out_path} - {e}")
+            return None
+        logger.debug(f"清洗XML文件: {xml_name} -> {os.path.basename(str(out_path))}")
+    
+    return {'is_valid': result['is_valid'], 'removed_count': result['removed_count']}
+
+
+# 目录快照：按文件名排序的文件名、大小、纳秒修改时间，以及目录自身的纳秒修改时间
+DirSnapshot = namedtuple('DirSnapshot', 'names sizes mtimes dir_mtime')
+
+
+def _size_from_voc(size) -> Tuple[int, int]:
+    """
+    将_read_voc_annotation返回的size文本元组转换为(width, height)
+    
+    Args:
+        size: (width, height, depth)文本元组或None
+        
+    Returns:
+        (width, height)，缺失或无法解析时对应值为0
+    """
+    if size is None:
+        return 0, 0
+    try:
+        return int(float(size[0])), int(float(size[1]))
+    except (TypeError, ValueError):
+        return 0, 0
+
+
+# JPEG中携带图像尺寸的SOF段标记（排除DHT、JPG、DAC）
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def _probe_image_size(img_path) -> Tuple[int, int]:
+    """
+    获取图像的(width, height)，不解码像素数据
+    
+    JPEG只读取文件头到SOF段为止；其它格式或头部异常时回退到cv2完整读取
+    
+    Args:
+        img_path: 图像文件路径
+        
+    Returns:
+        (width, height)，读取失败时为(0, 0)
+    """
+    try:
+        with open(img_path, 'rb') as f:
+            if f.read(2) == b'\xff\xd8':
+                while True:
+                    header = f.read(4)
+                    if len(header) < 4 or header[0] != 0xFF:
+                        break
+                    marker = header[1]
+                    segment_length = struct.unpack('>H', header[2:4])[0]
+                    if marker in _JPEG_SOF_MARKERS:
+                        # SOF段：精度(1字节)、高度(2字节)、宽度(2字节)
+                        height, width = struct.unpack('>xHH', f.read(5))
+                        if width and height:
+                            return width, height
+                        break
+                    f.seek(segment_length - 2, os.SEEK_CUR)
+    except (OSError, struct.error):
+        pass
+    
+    img = cv2.imread(str(img_path))
+    if img is None:
+        return 0, 0
+    height, width = img.shape[:2]
+    return width, height
+
+
 class VOCDataset:
     """VOC数据集处理类"""
     
@@ -43,7 +410,7 @@ class VOCDataset:
                  val_ratio: float = VAL_RATIO, test_ratio: float = TEST_RATIO,
                  max_workers: int = 4, annotations_folder_name: str = ANNOTATIONS_DIR,
                  exclude_labels: List[str] = None, include_labels: List[str] = None, 
-                 output_annotations_name: str = None):
+                 output_annotations_name: str = None, executor_kind: str = 'thread'):
         """
         初始化VOC数据集
         
@@ -58,6 +425,10 @@ class VOCDataset:
             exclude_labels: 需要排除的标签列表
             include_labels: 需要保留的标签列表（如果指定，则只保留这些标签）
             output_annotations_name: 自定义输出标注文件夹名称
+            executor_kind: XML清洗阶段的执行器类型，'thread'使用线程池（默认），'process'使用读取/过滤/写入流水线，
+                过滤阶段在进程池中执行。进程模式需要显式开启：Windows等以spawn方式启动子进程的平台上，
+                调用脚本必须把入口代码放在 if __name__ == "__main__": 保护下；每个工作进程重新导入模块时
+                会各自创建日志文件处理器，多个进程同时写入并轮转同一日志文件并不安全
         """
         self.dataset_path = Path(dataset_path)
         # 自动获取数据集名称（文件夹最后一个名称）
@@ -66,10 +437,9 @@ class VOCDataset:
         # 标注文件夹名称（可自定义）
         self.annotations_folder_name = annotations_folder_name
         
-        # 标签过滤配置
-        # 标签过滤配置
-        self.exclude_labels = exclude_labels or []
-        self.include_labels = include_labels or []
+        # 标签过滤配置，转换为frozenset使每个object的标签判断为O(1)
+        self.exclude_labels = _to_label_set(exclude_labels)
+        self.include_labels = _to_label_set(include_labels)
         self.output_annotations_name = output_annotations_name or ANNOTATIONS_OUTPUT_DIR
         
         # 数据集划分比例
@@ -82,6 +452,11 @@ class VOCDataset:
         self.thread_pool = ThreadPoolExecutor(max_workers=max_workers)
         self._lock = threading.Lock()  # 线程安全锁
         
+        # 默认使用线程池；进程池可绕开GIL，但对调用方有入口保护要求，需显式选择
+        if executor_kind not in ('process', 'thread'):
+            raise ValueError(f"不支持的执行器类型: {executor_kind}")
+        self.executor_kind = executor_kind
+        
         # 标准VOC目录结构 - 使用os.path.join拼接路径
         self.annotations_dir = Path(os.path.join(str(self.dataset_path), self.annotations_folder_name))
         self.images_dir = Path(os.path.join(str(self.dataset_path), JPEGS_DIR))
@@ -105,6 +480,12 @@ class VOCDataset:
         # 类别集合
         self.classes = set()
         
+        # 类别数量统计缓存：标注目录绝对路径 -> (统计缓存键, 文件数, 类别数量统计)
+        self._class_count_cache: Dict[str, Tuple[str, int, Dict[str, int]]] = {}
+        
+        # 目录快照缓存：目录路径 -> DirSnapshot，修改目录内容的步骤负责失效
+        self._snapshots: Dict[str, DirSnapshot] = {}
+        
         # 尺寸不匹配记录
         self.dimension_mismatches = []
         self.channel_mismatches = []
@@ -113,6 +494,8 @@ class VOCDataset:
         logger.info(f"数据集路径: {self.dataset_path.absolute()}")
         logger.info(f"划分比例 - 训练集: {self.train_ratio}, 验证集: {self.val_ratio}, 测试集: {self.test_ratio}")
         logger.info(f"线程池配置 - 最大工作线程: {self.max_workers}")
+        logger.info(f"XML清洗执行器: {self.executor_kind}")
+        logger.info(f"XML解析后端: {XML_BACKEND_NAME}")
         
         # 验证用户标签文件
         if self.user_labels_file:
@@ -182,20 +565,137 @@ class VOCDataset:
         
         logger.info("数据集基本结构验证通过")
     
+    def _snapshot(self, dir_path: Path) -> DirSnapshot:
+        """
+        获取目录快照
+        
+        单次os.scandir遍历记录所有文件的名称、大小和修改时间，按目录缓存在实例上，
+        文件对缓存校验、文件扫描和指纹计算共用同一份快照，不再各自遍历目录。
+        修改目录内容的步骤需调用_invalidate_snapshot
+        """
+        key = str(dir_path)
+        snap = self._snapshots.get(key)
+        if snap is None:
+            files = []
+            with os.scandir(key) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        files.append((entry.name, stat.st_size, stat.st_mtime_ns))
+            files.sort()
+            names, sizes, mtimes = (tuple(column) for column in zip(*files)) if files else ((), (), ())
+            snap = DirSnapshot(names, sizes, mtimes, os.stat(key).st_mtime_ns)
+            self._snapshots[key] = snap
+        return snap
+    
+    def _invalidate_snapshot(self, *dir_paths: Path):
+        """使指定目录的快照失效，下次访问时重新扫描"""
+        for dir_path in dir_paths:
+            self._snapshots.pop(str(dir_path), None)
+    
+    def _get_dir_max_mtime(self, dir_path: Path) -> int:
+        """获取目录自身及其中所有文件的最大纳秒修改时间（目录的修改时间反映文件的增删）"""
+        snap = self._snapshot(dir_path)
+        return max((snap.dir_mtime,) + snap.mtimes)
+    
+    def _scan_dir_files(self, dir_path: Path, extensions) -> List[Path]:
+        """从目录快照中筛选扩展名（不区分大小写）在extensions中的文件，按文件名排序"""
+        suffixes = frozenset(ext.lower() for ext in extensions)
+        dir_str = str(dir_path)
+        # 只对扩展名部分做小写转换后查集合，不对整个文件名做小写和endswith
+        files = []
+        for name in self._snapshot(dir_path).names:
+            dot = name.rfind('.')
+            if dot >= 0 and name[dot:].lower() in suffixes:
+                files.append(Path(os.path.join(dir_str, name)))
+        return files
+    
+    def _get_pairs_cache_file(self) -> Path:
+        """获取文件对缓存文件路径"""
+        return Path(os.path.join(str(self.dataset_path), VOC_PAIRS_CACHE_JSON))
+    
+    def _load_pairs_cache(self) -> bool:
+        """
+        加载文件对缓存
+        
+        标注目录和图像目录的最大修改时间与缓存一致时，直接使用缓存中的文件对，跳过文件扫描和验证
+        
+        Returns:
+            是否成功使用缓存
+        """
+        cache_file = self._get_pairs_cache_file()
+        if not cache_file.exists():
+            return False
+        
+        try:
+            with open(cache_file, 'r', encoding=DEFAULT_ENCODING) as f:
+                cache = json.load(f)
+            
+            if (cache.get('annotations_folder') != self.annotations_folder_name
+                    or cache.get('ann_mtime') != self._get_dir_max_mtime(self.annotations_dir)
+                    or cache.get('img_mtime') != self._get_dir_max_mtime(self.images_dir)):
+                logger.info("文件对缓存已过期，重新扫描文件")
+                return False
+            
+            # 目录只转换一次，循环内直接拼接文件名
+            images_dir = str(self.images_dir)
+            annotations_dir = str(self.annotations_dir)
+            self.valid_pairs = [(Path(os.path.join(images_dir, image_name)),
+                                 Path(os.path.join(annotations_dir, xml_name)))
+                                for image_name, xml_name in cache['pairs']]
+            self.images_without_xml = [Path(os.path.join(images_dir, image_name))
+                                       for image_name in cache.get('images_without_xml', [])]
+            
+        except Exception as e:
+            logger.warning(f"读取文件对缓存失败，重新扫描文件: {e}")
+            return False
+        
+        logger.info(f"使用文件对缓存: {cache_file}")
+        logger.info(f"  有效文件对: {len(self.valid_pairs)} 个")
+        logger.info(f"  缺少XML的图像: {len(self.images_without_xml)} 个")
+        
+        print(f"⚡ 使用文件对缓存: {len(self.valid_pairs)} 对有效文件")
+        if self.images_without_xml:
+            print(f"⚠️  发现 {len(self.images_without_xml)} 个图像缺少XML标注（已跳过）")
+        return True
+    
+    def _save_pairs_cache(self):
+        """保存文件对缓存，供下次运行跳过文件扫描"""
+        cache_file = self._get_pairs_cache_file()
+        
+        try:
+            cache = {
+                'ann_mtime': self._get_dir_max_mtime(self.annotations_dir),
+                'img_mtime': self._get_dir_max_mtime(self.images_dir),
+                'annotations_folder': self.annotations_folder_name,
+                'pairs': [[image_file.name, xml_file.name] for image_file, xml_file in self.valid_pairs],
+                'images_without_xml': [image_file.name for image_file in self.images_without_xml]
+            }
+            with open(cache_file, 'w', encoding=DEFAULT_ENCODING) as f:
+                json.dump(cache, f, ensure_ascii=False)
+            
+            logger.info(f"文件对缓存已保存: {cache_file}")
+            
+        except Exception as e:
+            logger.warning(f"保存文件对缓存失败: {e}")
+    
     def _match_files_parallel(self):
         """并行匹配图像和标注文件"""
         logger.info("开始并行匹配图像和标注文件...")
         
+        # 目录未变化时直接使用缓存的文件对
+        if self._load_pairs_cache():
+            return
+        
         print("🔍 正在扫描文件...")
         
-        # 获取所有图像文件
-        image_files = []
-        for ext in IMAGE_EXTENSIONS:
-            image_files.extend(list(self.images_dir.glob(f"*{ext}")))
-            image_files.extend(list(self.images_dir.glob(f"*{ext.upper()}")))
+        # 单次os.scandir遍历获取所有图像文件，DirEntry缓存了文件类型，无需逐个stat
+        # 按IMAGE_EXTENSIONS顺序排列，同名图像以靠后的扩展名为准
+        image_files = self._scan_dir_files(self.images_dir, IMAGE_EXTENSIONS)
+        image_files.sort(key=lambda f: IMAGE_EXTENSIONS.index(f.suffix.lower()))
         
         # 获取所有XML文件
-        xml_files = list(self.annotations_dir.glob(f"*{XML_EXTENSION}"))
+        xml_files = self._scan_dir_files(self.annotations_dir, [XML_EXTENSION])
         
         print(f"📊 发现图像文件: {len(image_files)} 个")
         print(f"📊 发现XML文件: {len(xml_files)} 个")
@@ -206,10 +706,7 @@ class VOCDataset:
         logger.info(f"   XML标注文件: {len(xml_files)} 个")
         
         # 统计图像文件类型分布
-        image_type_count = {}
-        for img in image_files:
-            ext = img.suffix.lower()
-            image_type_count[ext] = image_type_count.get(ext, 0) + 1
+        image_type_count = Counter(img.suffix.lower() for img in image_files)
         
         logger.info(f"📈 图像文件类型分布:")
         for ext, count in sorted(image_type_count.items()):
@@ -307,6 +804,9 @@ class VOCDataset:
         print(f"✅ 并行文件匹配完成: {len(self.valid_pairs)} 对有效文件")
         if self.images_without_xml:
             print(f"⚠️  发现 {len(self.images_without_xml)} 个图像缺少XML标注（已跳过）")
+        
+        # 保存文件对缓存
+        self._save_pairs_cache()
     
     def _validate_file_pair_with_check(self, image_file: Path, xml_file: Path) -> Tuple[Path, Path]:
         """使用线程池验证单个文件对的有效性，包括更详细的检查"""
@@ -329,10 +829,10 @@ class VOCDataset:
                 logger.warning(f"XML文件为空: {xml_file.name}")
                 return None
             
-            # 简单验证XML文件格式
+            # 简单验证XML文件格式，流式解析并随即清空元素，不构建完整的DOM树
             try:
-                import xml.etree.ElementTree as ET
-                ET.parse(xml_file)
+                for _, elem in iterparse_xml(xml_file):
+                    elem.clear()
             except ET.ParseError as e:
                 logger.error(f"XML文件格式错误: {xml_file.name} - {e}")
                 return None
@@ -351,6 +851,13 @@ class VOCDataset:
         """删除空标注文件并清洗XML到输出目录"""
         logger.info("开始检查空标注并清洗XML文件到输出目录...")
         
+        # 调用时指定的过滤条件覆盖初始化时的配置，在入口处统一转换为frozenset，
+        # 之后通过进程池初始化函数每个进程只传递一次
+        if include_labels is not None:
+            self.include_labels = _to_label_set(include_labels)
+        if exclude_labels is not None:
+            self.exclude_labels = _to_label_set(exclude_labels)
+        
         print("🧹 正在清洗XML文件...")
         
         # 清空输出目录
@@ -360,36 +867,50 @@ class VOCDataset:
         
         valid_pairs_after_cleanup = []
         empty_annotations = []
+        removed_objects = 0
         
         # 并行处理XML文件清洗
-        with tqdm(total=len(self.valid_pairs), desc="清洗XML文件", unit="文件") as pbar:
-            futures = []
-            for image_file, xml_file in self.valid_pairs:
-                future = self.thread_pool.submit(self._process_xml_file, image_file, xml_file, exclude_labels, include_labels)
-                futures.append(future)
-            
-            for future in as_completed(futures):
-                try:
-                    result = future.result()
-                    if result:
-                        if result['is_valid']:
-                            valid_pairs_after_cleanup.append((result['image_file'], result['output_xml_file']))
-                        else:
-                            empty_annotations.append((result['image_file'], result['xml_file']))
-                    pbar.update(1)
-                except Exception as e:
-                    logger.error(f"处理XML文件时出错: {e}")
-                    pbar.update(1)
+        xml_files = [xml_file for _, xml_file in self.valid_pairs]
+        output_dir = str(self.annotations_output_dir)
+        output_xml_files = [Path(os.path.join(output_dir, xml_file.name)) for xml_file in xml_files]
+        task_count = len(xml_files)
+        
+        try:
+            if self.executor_kind == 'process':
+                # 读取、过滤、写入三级流水线，磁盘读写与进程池解析重叠执行
+                results = self._clean_xml_pipeline(xml_files, output_xml_files)
+            else:
+                # 进度按实际完成顺序更新，结果仍按原顺序存放
+                results = [None] * task_count
+                futures = {self.thread_pool.submit(_clean_one_xml, xml_file, output_xml_file,
+                                                   self.include_labels, self.exclude_labels): index
+                           for index, (xml_file, output_xml_file) in enumerate(zip(xml_files, output_xml_files))}
+                for future in tqdm(as_completed(futures), total=task_count, desc="清洗XML文件", unit="文件"):
+                    results[futures[future]] = future.result()
+            
+            for (image_file, xml_file), output_xml_file, result in zip(self.valid_pairs, output_xml_files, results):
+                result = self._build_clean_result(image_file, xml_file, output_xml_file, result)
+                if result:
+                    removed_objects += result['removed_count']
+                    if result['is_valid']:
+                        valid_pairs_after_cleanup.append((result['image_file'], result['output_xml_file']))
+                    else:
+                        empty_annotations.append((result['image_file'], result['xml_file']))
+        except Exception as e:
+            logger.error(f"处理XML文件时出错: {e}")
+            raise
         
         # 更新有效文件对，现在指向清洗后的XML文件
         self.valid_pairs = valid_pairs_after_cleanup
         
         # 更新annotations_dir指向清洗后的目录
         self.annotations_dir = self.annotations_output_dir
+        self._invalidate_snapshot(self.annotations_output_dir)
         
         logger.info(f"XML清洗完成:")
         logger.info(f"  发现空标注: {len(empty_annotations)} 个")
         logger.info(f"  清洗后有效文件: {len(self.valid_pairs)} 个")
+        logger.info(f"  移除的目标: {removed_objects} 个")
         logger.info(f"  清洗输出目录: {self.annotations_output_dir}")
         
         print(f"🧹 XML清洗完成:")
@@ -404,92 +925,132 @@ class VOCDataset:
             if len(empty_annotations) > 10:
                 logger.warning(f"  ... 还有 {len(empty_annotations) - 10} 个空标注文件")
     
-    def _process_xml_file(self, image_file: Path, xml_file: Path, exclude_labels=None, include_labels=None) -> Dict:
-        """处理单个XML文件，保持原有格式并过滤指定标签"""
-        try:
-            # 解析XML文件
-            tree = ET.parse(xml_file)
-            root = tree.getroot()
-            
-            # 检查是否有object标签
-            objects = root.findall('object')
-            
-            if not objects:
-                # 空标注文件，不复制到输出目录
-                logger.warning(f"发现空标注文件: {xml_file.name}")
-                return {
-                    'is_valid': False,
-                    'image_file': image_file,
-                    'xml_file': xml_file,
-                    'output_xml_file': None
-                }
+    def _clean_xml_pipeline(self, xml_files: List[Path], output_xml_files: List[Path]) -> List[Dict]:
+        """
+        三级流水线清洗XML文件：读取线程池 -> 过滤进程池 -> 写入线程池
+        
+        读取和写入是磁盘IO，由线程完成；解析过滤是CPU计算，由进程池完成。
+        阶段之间用有界队列衔接，三个阶段重叠执行，内存中的文件数量受队列长度限制
+        
+        Args:
+            xml_files: 输入XML文件列表
+            output_xml_files: 与输入一一对应的输出XML文件列表
             
-            # 过滤排除的标签
-            # 过滤标签 - 支持包含模式和排除模式
-            valid_objects = []
-            removed_count = 0
+        Returns:
+            与xml_files顺序一致的清洗结果列表，处理失败的文件为None
+        """
+        task_count = len(xml_files)
+        results = [None] * task_count
+        read_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        write_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        stop_reading = threading.Event()
+        
+        def read_files(indices):
+            """读取阶段：按顺序读取分到的文件，结束时放入结束标记"""
+            try:
+                for index in indices:
+                    if stop_reading.is_set():
+                        break
+                    try:
+                        with open(xml_files[index], 'rb') as f:
+                            read_queue.put((index, f.read()))
+                    except OSError as e:
+                        logger.error(f"读取XML文件失败: {xml_files[index]} - {e}")
+            finally:
+                read_queue.put(None)
+        
+        def write_files():
+            """写入阶段：保存过滤后的XML，直到收到结束标记"""
+            while True:
+                item = write_queue.get()
+                if item is None:
+                    break
+                index, result = item
+                try:
+                    if result['is_valid']:
+                        with open(output_xml_files[index], 'wb') as f:
+                            f.write(result['xml_bytes'])
+                    results[index] = {'is_valid': result['is_valid'], 'removed_count': result['removed_count']}
+                except Exception as e:
+                    logger.error(f"保存XML文件失败: {output_xml_files[index]} - {e}")
+        
+        def collect_done(done, pbar):
+            """将已完成的过滤结果交给写入阶段"""
+            for future in done:
+                index = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"过滤XML文件失败: {xml_files[index]} - {e}")
+                    result = None
+                if result is not None:
+                    write_queue.put((index, result))
+                pbar.update(1)
+        
+        # 过滤是CPU密集型任务，进程数不超过CPU核数；过滤条件通过初始化函数每个进程只传递一次
+        cpu_workers = min(self.max_workers, os.cpu_count() or 1)
+        pending = {}
+        with ThreadPoolExecutor(max_workers=PIPELINE_READ_WORKERS) as read_pool, \
+                ProcessPoolExecutor(max_workers=cpu_workers, initializer=_init_label_filter,
+                                    initargs=(self.include_labels, self.exclude_labels)) as cpu_pool, \
+                ThreadPoolExecutor(max_workers=PIPELINE_WRITE_WORKERS) as write_pool:
+            reader_futures = [read_pool.submit(read_files, range(i, task_count, PIPELINE_READ_WORKERS))
+                              for i in range(PIPELINE_READ_WORKERS)]
+            writer_futures = [write_pool.submit(write_files) for _ in range(PIPELINE_WRITE_WORKERS)]
             
-            for obj in objects:
-                name_elem = obj.find('name')
-                should_remove = False
-                
-                if name_elem is not None and name_elem.text:
-                    label_name = name_elem.text.strip()
+            try:
+                # 计算阶段：从读取队列取出文件内容提交到进程池，在途任务数受队列长度限制
+                finished_readers = 0
+                with tqdm(total=task_count, desc="清洗XML文件", unit="文件") as pbar:
+                    while finished_readers < PIPELINE_READ_WORKERS:
+                        item = read_queue.get()
+                        if item is None:
+                            finished_readers += 1
+                            continue
+                        index, xml_bytes = item
+                        future = cpu_pool.submit(_filter_xml_bytes_in_worker, xml_bytes, xml_files[index].name)
+                        pending[future] = index
+                        if len(pending) >= PIPELINE_QUEUE_SIZE:
+                            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                            collect_done(done, pbar)
                     
-                    # 如果指定了include_labels，则只保留这些标签
-                    if self.include_labels:
-                        if label_name not in self.include_labels:
-                            should_remove = True
-                            logger.debug(f"移除标签 '{label_name}' (不在保留列表中) 从文件 {xml_file.name}")
-                    # 否则使用exclude_labels排除模式
-                    elif self.exclude_labels:
-                        if label_name in self.exclude_labels:
-                            should_remove = True
-                            logger.debug(f"移除标签 '{label_name}' (在排除列表中) 从文件 {xml_file.name}")
-                else:
-                    # 移除无效的object标签
-                    should_remove = True
-                    logger.debug(f"移除无效object标签 从文件 {xml_file.name}")
-                
-                if should_remove:
-                    root.remove(obj)
-                    removed_count += 1
-                else:
-                    valid_objects.append(obj)
-            
-            # 检查过滤后是否还有有效对象
-            remaining_objects = root.findall('object')
-            if not remaining_objects:
-                logger.warning(f"过滤后无有效对象: {xml_file.name}")
-                return {
-                    'is_valid': False,
-                    'image_file': image_file,
-                    'xml_file': xml_file,
-                    'output_xml_file': None
-                }
-            
-            # 有效标注文件，保存到输出目录并保持格式
-            output_xml_file = Path(os.path.join(str(self.annotations_output_dir), xml_file.name))
-            
-            # 保存过滤后的XML文件，保持原有格式
-            self._save_filtered_xml_with_format(tree, output_xml_file)
-            
-            if removed_count > 0:
-                logger.info(f"过滤XML文件: {xml_file.name} -> 移除 {removed_count} 个对象")
-            else:
-                logger.debug(f"清洗XML文件: {xml_file.name} -> {output_xml_file.name}")
-            
-            return {
-                'is_valid': True,
-                'image_file': image_file,
-                'xml_file': xml_file,
-                'output_xml_file': output_xml_file,
-                'removed_count': removed_count
-            }
-                
-        except Exception as e:
-            logger.error(f"处理XML文件失败: {xml_file.name} - {e}")
+                    collect_done(as_completed(list(pending)), pbar)
+                    # 读取失败的文件不会进入计算阶段，直接计入进度
+                    pbar.update(task_count - pbar.n)
+            finally:
+                # 计算阶段异常退出时，清空读取队列使读取线程不再阻塞
+                stop_reading.set()
+                while not all(future.done() for future in reader_futures):
+                    try:
+                        read_queue.get(timeout=0.1)
+                    except queue.Empty:
+                        pass
+                for _ in writer_futures:
+                    write_queue.put(None)
+            
+            for future in reader_futures + writer_futures:
+                future.result()
+        
+        return results
+    
+    def _process_xml_file(self, image_file: Path, xml_file: Path, exclude_labels=None, include_labels=None) -> Dict:
+        """处理单个XML文件，保持原有格式并过滤指定标签（保留原方法兼容性）"""
+        output_xml_file = Path(os.path.join(str(self.annotations_output_dir), xml_file.name))
+        result = _clean_one_xml(xml_file, output_xml_file, self.include_labels, self.exclude_labels)
+        return self._build_clean_result(image_file, xml_file, output_xml_file, result)
+    
+    @staticmethod
+    def _build_clean_result(image_file: Path, xml_file: Path, output_xml_file: Path, result: Dict) -> Dict:
+        """将清洗工作函数的返回值补全为包含文件路径的结果"""
+        if result is None:
             return None
+        return {
+            'is_valid': result['is_valid'],
+            'image_file': image_file,
+            'xml_file': xml_file,
+            'output_xml_file': output_xml_file if result['is_valid'] else None,
+            'removed_count': result['removed_count']
+        }
     
     def _copy_xml_with_format(self, source_xml: Path, target_xml: Path):
         """复制XML文件并保持原有格式（换行和缩进）"""
@@ -503,43 +1064,142 @@ class VOCDataset:
     def _save_filtered_xml_with_format(self, tree: ET.ElementTree, target_xml: Path):
         """保存过滤后的XML文件并保持原有格式（换行和缩进）"""
         try:
-            # 使用minidom保持格式化
-            rough_string = ET.tostring(tree.getroot(), 'unicode')
-            reparsed = minidom.parseString(rough_string)
-            
-            with open(target_xml, 'w', encoding='utf-8') as f:
-                # 移除第一行的XML声明，然后添加自定义的
-                lines = reparsed.toprettyxml(indent="  ").split('\n')[1:]
-                f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
-                f.write('\n'.join(line for line in lines if line.strip()))
-                
+            write_xml(tree, target_xml)
+            
         except Exception as e:
             logger.error(f"保存过滤后的XML文件失败: {target_xml} - {e}")
             raise
     
-    def _extract_classes(self):
-        """提取所有类别"""
-        logger.info("开始提取类别信息...")
+    def _fingerprint(self, annotations_dir: Path) -> str:
+        """
+        计算标注目录的指纹
         
-        self.classes = set()
-        class_count = {}
+        基于目录快照，对其中XML文件的元数据计算指纹（见metadata_fingerprint），无需读取文件内容；
+        与_scan_dir_files一致，扩展名不区分大小写，Foo.XML同样计入指纹
+        """
+        snap = self._snapshot(annotations_dir)
+        return metadata_fingerprint(entry for entry in zip(snap.names, snap.sizes, snap.mtimes)
+                                    if file_suffix(entry[0]) == XML_EXTENSION)
+    
+    def _stats_cache_key(self) -> str:
+        """
+        计算类别统计缓存的键
+        
+        清洗步骤每次运行都会重写输出目录，清洗后目录的修改时间不能作为缓存依据；
+        统计结果只取决于输入标注目录的内容、参与统计的有效文件对和筛选条件，
+        因此对输入标注目录指纹、有效文件对的XML文件名以及（统计清洗结果时的）筛选条件做摘要
+        """
+        source_dir = Path(os.path.join(str(self.dataset_path), self.annotations_folder_name))
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(self._fingerprint(source_dir).encode(DEFAULT_ENCODING))
+        if self.annotations_dir != source_dir:
+            digest.update(f"include:{','.join(sorted(self.include_labels))}\0".encode(DEFAULT_ENCODING))
+            digest.update(f"exclude:{','.join(sorted(self.exclude_labels))}\0".encode(DEFAULT_ENCODING))
+        for name in sorted(xml_file.name for _, xml_file in self.valid_pairs):
+            digest.update(name.encode(DEFAULT_ENCODING) + b'\0')
+        return digest.hexdigest()
+    
+    def _get_stats_cache_file(self, fingerprint: str) -> Path:
+        """获取指定指纹对应的统计缓存文件路径"""
+        return Path(os.path.join(str(self.dataset_path), STATS_CACHE_DIR, f"{fingerprint}.json"))
+    
+    def _load_stats_cache(self, fingerprint: str) -> Optional[Dict]:
+        """
+        读取磁盘上的统计缓存，不存在、损坏或结构不符时返回None
+        
+        缓存目录位于数据集内，可能随数据集一起分发，只按JSON读取并校验结构，不反序列化任意对象
+        """
+        cache_file = self._get_stats_cache_file(fingerprint)
+        if not cache_file.exists():
+            return None
+        try:
+            with open(cache_file, 'r', encoding=DEFAULT_ENCODING) as f:
+                stats = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取统计缓存失败: {cache_file} - {e}")
+            return None
+        
+        class_counts = stats.get('class_counts') if isinstance(stats, dict) else None
+        if not isinstance(class_counts, dict) or not all(
+                isinstance(count, int) for count in class_counts.values()):
+            logger.warning(f"统计缓存结构无效，忽略: {cache_file}")
+            return None
+        return stats
+    
+    def _save_stats_cache(self, fingerprint: str, stats: Dict):
+        """
+        保存统计缓存，先写临时文件再原子替换，避免中断时留下不完整的缓存；
+        保存后删除其他键的旧缓存文件（包括旧版本的pickle缓存），缓存目录中只保留最新的一份
+        """
+        cache_file = self._get_stats_cache_file(fingerprint)
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = Path(f"{cache_file}.tmp")
+            dump_json(stats, tmp_file)
+            os.replace(tmp_file, cache_file)
+            logger.info(f"统计缓存已保存: {cache_file}")
+        except Exception as e:
+            logger.warning(f"保存统计缓存失败: {cache_file} - {e}")
+            return
+        
+        with os.scandir(str(cache_file.parent)) as entries:
+            stale_files = [entry.path for entry in entries
+                           if entry.name.endswith(('.json', '.pkl')) and entry.name != cache_file.name]
+        for stale_file in stale_files:
+            try:
+                os.remove(stale_file)
+            except OSError as e:
+                logger.warning(f"删除过期统计缓存失败: {stale_file} - {e}")
+    
+    def _count_classes(self) -> Dict[str, int]:
+        """
+        统计有效文件对中每个类别的对象数量
+        
+        结果按统计缓存键（见_stats_cache_key）缓存在内存和数据集的统计缓存目录中，
+        输入标注、有效文件对和筛选条件均未变化时直接返回缓存，避免重复解析XML
         
+        Returns:
+            类别名到对象数量的映射
+        """
+        cache_key = str(self.annotations_dir.absolute())
+        fingerprint = self._stats_cache_key()
+        cached = self._class_count_cache.get(cache_key)
+        if cached is not None and cached[0] == fingerprint and cached[1] == len(self.valid_pairs):
+            logger.info(f"使用类别统计缓存: {cache_key}")
+            return cached[2]
+        
+        stats = self._load_stats_cache(fingerprint)
+        if stats is not None and stats.get('total_xml_files') == len(self.valid_pairs):
+            logger.info(f"使用磁盘统计缓存: {self._get_stats_cache_file(fingerprint)}")
+            class_count = stats['class_counts']
+            self._class_count_cache[cache_key] = (fingerprint, len(self.valid_pairs), class_count)
+            return class_count
+        
+        counter = Counter()
         for image_file, xml_file in tqdm(self.valid_pairs, desc="提取类别", unit="文件"):
             try:
-                tree = ET.parse(xml_file)
-                root = tree.getroot()
-                
-                # 查找所有object标签
-                for obj in root.findall('object'):
-                    name_elem = obj.find('name')
-                    if name_elem is not None and name_elem.text:
-                        class_name = name_elem.text.strip()
-                        self.classes.add(class_name)
-                        class_count[class_name] = class_count.get(class_name, 0) + 1
-                        
+                # 流式解析object标签，处理完即清空，内存占用与文件大小无关；
+                # Counter.update直接消费生成器，计数在C实现中完成
+                counter.update(_iter_object_names(xml_file))
             except Exception as e:
                 logger.error(f"提取类别时解析XML失败: {xml_file.name} - {e}")
         
+        class_count = dict(counter)
+        self._class_count_cache[cache_key] = (fingerprint, len(self.valid_pairs), class_count)
+        self._save_stats_cache(fingerprint, {
+            'classes': sorted(class_count),
+            'total_xml_files': len(self.valid_pairs),
+            'class_counts': class_count
+        })
+        return class_count
+    
+    def _extract_classes(self):
+        """提取所有类别"""
+        logger.info("开始提取类别信息...")
+        
+        class_count = self._count_classes()
+        self.classes = set(class_count)
+        
         logger.info(f"类别提取完成:")
         logger.info(f"  发现类别: {len(self.classes)} 个")
         logger.info(f"  类别列表: {sorted(self.classes)}")
@@ -643,6 +1303,8 @@ class VOCDataset:
         if auto_fix:
             logger.info(f"  修正XML: {stats['fixed_xmls']} 个")
             logger.info(f"  转换图像: {stats['converted_images']} 个")
+            if stats['fixed_xmls'] or stats['converted_images']:
+                self._invalidate_snapshot(self.annotations_dir, self.images_dir)
         
         print(f"📐 并行图像尺寸检查完成:")
         print(f"   检查文件: {stats['total_checked']} 个")
@@ -657,27 +1319,20 @@ class VOCDataset:
     def _check_single_image_dimension(self, image_file: Path, xml_file: Path, auto_fix: bool = False) -> Dict:
         """检查单个图像的尺寸信息"""
         try:
-            # 读取XML中的尺寸信息
-            tree = ET.parse(xml_file)
-            root = tree.getroot()
-            
-            size_elem = root.find('size')
-            if size_elem is None:
+            # 流式读取XML中的尺寸信息，只有需要修正时才加载完整的XML
+            size, _ = _read_voc_annotation(xml_file)
+            if size is None:
                 logger.warning(f"XML文件缺少size标签: {xml_file.name}")
                 return None
             
             # 获取XML中记录的尺寸
-            xml_width = size_elem.find('width')
-            xml_height = size_elem.find('height')
-            xml_depth = size_elem.find('depth')
-            
-            if xml_width is None or xml_height is None or xml_depth is None:
+            if None in size:
                 logger.warning(f"XML文件size标签不完整: {xml_file.name}")
                 return None
             
-            xml_w = int(xml_width.text)
-            xml_h = int(xml_height.text)
-            xml_d = int(xml_depth.text)
+            xml_w = int(size[0])
+            xml_h = int(size[1])
+            xml_d = int(size[2])
             
             # 读取实际图像
             img = cv2.imread(str(image_file))
@@ -741,12 +1396,14 @@ class VOCDataset:
                             actual_h, actual_w, actual_d = img_fixed.shape
                     
                     # 修正XML中的尺寸信息
-                    xml_width.text = str(actual_w)
-                    xml_height.text = str(actual_h)
-                    xml_depth.text = "3"  # 强制设为3通道
+                    tree = parse_xml(xml_file)
+                    size_elem = tree.getroot().find('size')
+                    size_elem.find('width').text = str(actual_w)
+                    size_elem.find('height').text = str(actual_h)
+                    size_elem.find('depth').text = "3"  # 强制设为3通道
                     
                     # 保存修正后的XML
-                    tree.write(xml_file, encoding=DEFAULT_ENCODING, xml_declaration=True)
+                    tree.write(str(xml_file), encoding=DEFAULT_ENCODING, xml_declaration=True)
                     logger.info(f"✅ 已修正XML尺寸信息: {xml_file.name} -> ({actual_w}x{actual_h}x3)")
                     result['fixed_xml'] = True
                 
@@ -831,16 +1488,18 @@ class VOCDataset:
         """写入划分文件 - 优化版本"""
         file_path = Path(os.path.join(str(self.imagesets_dir), filename))
         
+        # 目录前缀只拼接一次（os.path.join末尾传空串得到带分隔符的前缀）
+        image_prefix = os.path.join(JPEGS_DIR, '')
+        # 注意：现在XML文件在清洗后的目录中
+        annotation_prefix = os.path.join(self.output_annotations_name, '')
+        
         try:
             with open(file_path, 'w', encoding=DEFAULT_ENCODING) as f:
                 for file_name in tqdm(file_list, desc=f"写入{filename}", unit="文件"):
                     if file_name in stem_to_pair:
                         img_file, xml_file = stem_to_pair[file_name]
                         # 写入格式: 图像路径\t标注路径
-                        image_path = os.path.join(JPEGS_DIR, img_file.name)
-                        # 注意：现在XML文件在清洗后的目录中
-                        annotation_path = os.path.join(self.output_annotations_name, xml_file.name)
-                        line_content = f"{image_path}\t{annotation_path}\n"
+                        line_content = f"{image_prefix}{img_file.name}\t{annotation_prefix}{xml_file.name}\n"
                         f.write(line_content)
             
             logger.debug(f"写入划分文件: {filename} ({len(file_list)} 个文件)")
@@ -862,10 +1521,10 @@ class VOCDataset:
                 logger.error(error_msg)
                 return {"success": False, "message": error_msg}
             
-            # 读取类别信息
+            # 逐行读取类别信息，跳过空行
             with open(labels_file, 'r', encoding=DEFAULT_ENCODING) as f:
-                label_lines = f.readlines()
-                categories = [{'id': i + 1, 'name': label.strip()} for i, label in enumerate(label_lines)]
+                label_names = [line.strip() for line in f if line.strip()]
+            categories = [{'id': i + 1, 'name': label} for i, label in enumerate(label_names)]
             
             logger.info(f"📋 加载了 {len(categories)} 个类别")
             
@@ -881,11 +1540,11 @@ class VOCDataset:
                     logger.warning(f"{split}.txt 不存在，跳过 {split} 集转换")
                     continue
                 
-                # 检查文件是否有内容
+                # 检查文件是否有内容，读到第一个非空行即停止
                 with open(list_file, 'r', encoding=DEFAULT_ENCODING) as f:
-                    lines = [line.strip() for line in f.readlines() if line.strip()]
+                    has_content = any(line.strip() for line in f)
                 
-                if not lines:
+                if not has_content:
                     logger.warning(f"{split}.txt 文件为空，跳过 {split} 集转换")
                     continue
                 
@@ -904,9 +1563,6 @@ class VOCDataset:
     
     def _convert_split_to_coco_optimized(self, list_file: Path, categories: List[Dict], output_json: Path):
         """转换单个数据集划分到COCO格式"""
-        import json
-        from xml.etree import ElementTree as ET
-        
         images = []
         annotations = []
         annotation_id = 1
@@ -916,10 +1572,11 @@ class VOCDataset:
         
         # 读取图像列表
         with open(list_file, 'r', encoding=DEFAULT_ENCODING) as f:
-            lines = [line.strip() for line in f.readlines() if line.strip()]
+            lines = [line.strip() for line in f if line.strip()]
         
         print(f"📝 处理 {len(lines)} 个文件...")
         
+        dataset_root = str(self.dataset_path)
         for i, line in enumerate(tqdm(lines, desc=f"转换{list_file.stem}", unit="文件")):
             # 解析图像路径和标注路径
             parts = line.split('\t')
@@ -932,22 +1589,20 @@ class VOCDataset:
             image_filename = Path(image_path).name
             
             # 从XML文件提取图像尺寸
-            xml_path = Path(os.path.join(str(self.dataset_path), annotation_path))
-            if not xml_path.exists():
+            xml_path = os.path.join(dataset_root, annotation_path)
+            if not os.path.exists(xml_path):
                 logger.warning(f"XML文件不存在: {xml_path}")
                 continue
                 
             try:
-                tree = ET.parse(xml_path)
-                root = tree.getroot()
-                
-                size_elem = root.find('size')
-                if size_elem is None:
+                # 流式解析尺寸和目标信息，不构建完整的DOM树
+                size, objects = _read_voc_annotation(xml_path)
+                if size is None:
                     logger.warning(f"XML文件中没有size信息: {xml_path}")
                     continue
                     
-                image_height = int(size_elem.find('height').text)
-                image_width = int(size_elem.find('width').text)
+                image_height = int(size[1])
+                image_width = int(size[0])
                 
                 # 添加图像信息
                 images.append({
@@ -962,29 +1617,25 @@ class VOCDataset:
                 })
                 
                 # 解析标注信息
-                objects = root.findall('object')
-                for obj in objects:
+                for label, bndbox in objects:
                     # 获取类别名称
-                    name_elem = obj.find('name')
-                    if name_elem is None:
+                    if label is None:
                         continue
-                    label = name_elem.text
                     
-                    # 使用映射快速查找类别ID
+                    # 使用映射快速查找类别ID，未知类别不再解析边界框
                     category_id = category_name_to_id.get(label)
                     if category_id is None:
                         logger.warning(f"未知类别 '{label}' 在文件 {xml_path}")
                         continue
                     
                     # 获取边界框
-                    bbox_elem = obj.find('bndbox')
-                    if bbox_elem is None:
+                    if bndbox is None:
                         continue
                         
-                    xmin = int(bbox_elem.find('xmin').text)
-                    ymin = int(bbox_elem.find('ymin').text)
-                    xmax = int(bbox_elem.find('xmax').text)
-                    ymax = int(bbox_elem.find('ymax').text)
+                    xmin = int(bndbox[0])
+                    ymin = int(bndbox[1])
+                    xmax = int(bndbox[2])
+                    ymax = int(bndbox[3])
                     
                     # 计算COCO格式的边界框 [x, y, width, height]
                     width = xmax - xmin
@@ -1037,9 +1688,8 @@ class VOCDataset:
             "categories": categories
         }
         
-        # 写入JSON文件
-        with open(output_json, 'w', encoding='utf-8') as f:
-            json.dump(coco_data, f, indent=2, ensure_ascii=False)
+        # 写入JSON文件（安装了orjson时使用orjson）
+        dump_json(coco_data, output_json)
         
         logger.info(f"COCO格式转换完成: {len(images)} 张图像, {len(annotations)} 个标注")
 
@@ -1304,7 +1954,7 @@ class VOCDataset:
 
     def _clean_xml_files_parallel(self):
         """使用线程池并行清洗XML文件并保存到Annotations_clear目录"""
-        xml_files = list(self.annotations_dir.glob("*.xml"))
+        xml_files = self._scan_dir_files(self.annotations_dir, [XML_EXTENSION])
         
         if not xml_files:
             logger.warning("未找到XML文件")
@@ -1327,6 +1977,7 @@ class VOCDataset:
             except Exception as e:
                 logger.error(f"清洗XML文件时出错: {e}")
         
+        self._invalidate_snapshot(self.annotations_output_dir)
         logger.info(f"XML文件清洗完成，成功清洗 {cleaned_count}/{len(xml_files)} 个文件")
     
     def _clean_single_xml_file(self, xml_file: Path) -> bool:
@@ -1340,7 +1991,7 @@ class VOCDataset:
         """
         try:
             # 解析XML文件
-            tree = ET.parse(xml_file)
+            tree = parse_xml(xml_file)
             root = tree.getroot()
             
             # 检查是否需要清洗
@@ -1378,20 +2029,13 @@ class VOCDataset:
             
             # 移除无效对象
             for obj in objects_to_remove:
-                root.remove(obj)
+                remove_element(root, obj)
             
             # 如果需要清洗或者强制保存清洗版本，则保存到输出目录
             output_file = Path(os.path.join(str(self.annotations_output_dir), xml_file.name))
             
-            # 使用minidom保持格式化
-            rough_string = ET.tostring(root, 'unicode')
-            reparsed = minidom.parseString(rough_string)
-            
-            with open(output_file, 'w', encoding='utf-8') as f:
-                # 移除第一行的XML声明，然后添加自定义的
-                lines = reparsed.toprettyxml(indent="  ").split('\n')[1:]
-                f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
-                f.write('\n'.join(line for line in lines if line.strip()))
+            # 保存并保持原有格式
+            self._save_filtered_xml_with_format(tree, output_file)
             
             if needs_cleaning:
                 logger.info(f"清洗并保存XML文件: {xml_file.name}")
@@ -1434,12 +2078,11 @@ class VOCDataset:
             split_name: 划分名称 (train/val)
             split_file: 划分文件路径
         """
-        import json
         from datetime import datetime
         
         # 读取文件列表
         with open(split_file, 'r', encoding='utf-8') as f:
-            file_names = [line.strip() for line in f.readlines()]
+            file_names = [line.strip() for line in f]
         
         # 初始化COCO格式数据
         coco_data = {
@@ -1477,22 +2120,31 @@ class VOCDataset:
         image_id = 1
         annotation_id = 1
         
+        images_dir = str(self.images_dir)
+        annotations_output_dir = str(self.annotations_output_dir)
+        
         # 处理每个文件
         for file_name in tqdm(file_names, desc=f"转换{split_name}集"):
             # 图像文件路径
-            img_file = Path(os.path.join(str(self.images_dir), f"{file_name}.jpg"))
-            xml_file = Path(os.path.join(str(self.annotations_output_dir), f"{file_name}.xml"))  # 使用清洗后的XML
+            img_file = Path(os.path.join(images_dir, f"{file_name}.jpg"))
+            xml_file = Path(os.path.join(annotations_output_dir, f"{file_name}.xml"))  # 使用清洗后的XML
             
             if not img_file.exists() or not xml_file.exists():
                 continue
             
-            # 读取图像信息
+            # 流式解析XML标注，图像尺寸优先使用XML中的size，避免解码图像
             try:
-                import cv2
-                img = cv2.imread(str(img_file))
-                height, width = img.shape[:2]
-            except:
-                continue
+                size, objects = _read_voc_annotation(xml_file)
+                parse_error = None
+            except Exception as e:
+                size, objects, parse_error = None, [], e
+            
+            width, height = _size_from_voc(size)
+            if not width or not height:
+                # size缺失或为0时才读取图像文件头获取尺寸
+                width, height = _probe_image_size(img_file)
+                if not width or not height:
+                    continue
             
             # 添加图像信息
             coco_data["images"].append({
@@ -1506,21 +2158,21 @@ class VOCDataset:
                 "date_captured": ""
             })
             
-            # 解析XML标注
+            if parse_error is not None:
+                logger.warning(f"解析XML文件 {xml_file.name} 时出错: {parse_error}")
+                continue
+            
+            # 转换XML标注
             try:
-                tree = ET.parse(xml_file)
-                root = tree.getroot()
-                
-                for obj in root.findall('object'):
-                    name = obj.find('name').text
-                    if name not in class_to_id:
+                for name, bndbox in objects:
+                    # 不需要的类别直接跳过，不解析边界框
+                    if name not in class_to_id or bndbox is None:
                         continue
                     
-                    bndbox = obj.find('bndbox')
-                    xmin = int(float(bndbox.find('xmin').text))
-                    ymin = int(float(bndbox.find('ymin').text))
-                    xmax = int(float(bndbox.find('xmax').text))
-                    ymax = int(float(bndbox.find('ymax').text))
+                    xmin = int(float(bndbox[0]))
+                    ymin = int(float(bndbox[1]))
+                    xmax = int(float(bndbox[2]))
+                    ymax = int(float(bndbox[3]))
                     
                     # 计算COCO格式的边界框 [x, y, width, height]
                     bbox_width = xmax - xmin
@@ -1548,8 +2200,7 @@ class VOCDataset:
         
         # 保存COCO格式文件
         output_file = Path(os.path.join(str(self.dataset_path), f"{split_name}_coco.json"))
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(coco_data, f, indent=2, ensure_ascii=False)
+        dump_json(coco_data, output_file)
         
         logger.info(f"COCO格式文件已保存: {output_file}")
         logger.info(f"{split_name}集包含 {len(coco_data['images'])} 张图像，{len(coco_data['annotations'])} 个标注")
@@ -1563,7 +2214,7 @@ if __name__ == "__main__":
         voc_dataset = VOCDataset(dataset_path)
         print("数据集信息:", voc_dataset.get_dataset_info())
         
-    except Exception as e:
+    except (OSError, ValueError) as e:
         logger.error(f"测试失败: {e}")
         print(f"错误: {e}")
 
@@ -11,22 +11,174 @@ YOLO系列数据格式转换器
 
 import os
 import shutil
-import xml.etree.ElementTree as ET
 from typing import List, Optional, Dict
 from tqdm import tqdm
-import sys
+import numpy as np
 from pathlib import Path
 
-# 导入日志系统 - 使用全局变量
-sys.path.append(str(Path(__file__).parent.parent))
-from logger_code.logger_sys import get_logger
-from global_var.global_cls import *
+# 导入日志系统 - 使用全局变量（包内相对导入，无需修改sys.path）
+from ..logger_code.logger_sys import get_logger
+from ..global_var.global_cls import *
+from ._xml_backend import parse_xml
 
 # 获取当前文件名作为日志标识
 current_filename = Path(__file__).stem
 logger = get_logger(current_filename)
 
 
+def convert_xml_to_yolo_lines(xml_path: str, class_to_id: Dict[str, int]) -> Optional[List[str]]:
+    """
+    将单个XML标注文件转换为YOLO格式标注行
+    
+    模块级函数，不依赖实例状态，可被进程池序列化调用
+    
+    Args:
+        xml_path: XML文件路径
+        class_to_id: 类别名称到类别ID的映射
+        
+    Returns:
+        YOLO格式标注行列表，解析失败时返回None
+    """
+    try:
+        tree = parse_xml(xml_path)
+        root = tree.getroot()
+        
+        # 获取图像尺寸
+        size = root.find(XML_SIZE_TAG)
+        if size is None:
+            return None
+            
+        img_width = int(size.find(XML_WIDTH_TAG).text)
+        img_height = int(size.find(XML_HEIGHT_TAG).text)
+        
+        class_ids = []
+        boxes = []
+        
+        # 收集每个目标的类别ID和边界框
+        for obj in root.findall(XML_OBJECT_TAG):
+            class_name = obj.find(XML_NAME_TAG).text
+            
+            if class_name not in class_to_id:
+                continue
+            
+            # 获取边界框
+            bbox = obj.find(XML_BNDBOX_TAG)
+            if bbox is None:
+                continue
+            
+            class_ids.append(class_to_id[class_name])
+            boxes.append((float(bbox.find(XML_XMIN_TAG).text),
+                          float(bbox.find(XML_YMIN_TAG).text),
+                          float(bbox.find(XML_XMAX_TAG).text),
+                          float(bbox.find(XML_YMAX_TAG).text)))
+        
+        if not boxes:
+            return []
+        
+        # 转换为YOLO格式 (归一化的中心点坐标和宽高)，整张图的目标一次向量化计算，
+        # 每张图只计算一次尺寸的倒数，用乘法代替逐个目标的除法
+        boxes = np.asarray(boxes, dtype=np.float64)
+        inv_width = 1.0 / img_width
+        inv_height = 1.0 / img_height
+        center_x = (boxes[:, 0] + boxes[:, 2]) * (0.5 * inv_width)
+        center_y = (boxes[:, 1] + boxes[:, 3]) * (0.5 * inv_height)
+        width = (boxes[:, 2] - boxes[:, 0]) * inv_width
+        height = (boxes[:, 3] - boxes[:, 1]) * inv_height
+        
+        return [f"{class_id} {cx:.6f} {cy:.6f} {w:.6f} {h:.6f}"
+                for class_id, cx, cy, w, h in zip(class_ids, center_x.tolist(), center_y.tolist(),
+                                                   width.tolist(), height.tolist())]
+        
+    except Exception as e:
+        logger.error(f"转换XML文件失败: {os.path.basename(xml_path)}, 错误: {str(e)}")
+        return None
+
+
+def write_yolo_label_file(label_path: str, yolo_lines: List[str]):
+    """
+    保存YOLO格式标注文件
+    
+    所有标注行先拼接编码为一个字节串，以二进制模式一次写入，避免逐行写入和文本编码层的开销
+    
+    Args:
+        label_path: 标注文件路径
+        yolo_lines: YOLO格式标注行列表
+    """
+    with open(label_path, 'wb') as f:
+        f.write(NEWLINE.join(yolo_lines).encode(DEFAULT_ENCODING))
+
+
+def file_suffix(file_name: str) -> str:
+    """获取小写的文件扩展名（含点），只对扩展名部分做小写转换，无扩展名时返回空字符串"""
+    dot = file_name.rfind('.')
+    return file_name[dot:].lower() if dot >= 0 else ''
+
+
+def count_files_with_suffixes(dir_path: str, suffixes) -> int:
+    """
+    单次os.scandir遍历目录，统计扩展名（不区分大小写）在suffixes中的文件数
+
+    Args:
+        dir_path: 目录路径
+        suffixes: 扩展名集合，如IMAGE_EXTENSION_SET
+    """
+    with os.scandir(dir_path) as entries:
+        return sum(1 for entry in entries if file_suffix(entry.name) in suffixes and entry.is_file())
+
+
+def _copy_file_range(source_path: str, target_path: str):
+    """
+    使用os.copy_file_range在内核中拷贝文件内容
+
+    在btrfs/xfs等支持reflink的文件系统上只共享数据块，不实际拷贝
+
+    Raises:
+        OSError: 平台或文件系统不支持时抛出
+    """
+    if not hasattr(os, 'copy_file_range'):
+        raise OSError("当前平台不支持copy_file_range")
+    with open(source_path, 'rb') as fsrc, open(target_path, 'wb') as fdst:
+        remaining = os.fstat(fsrc.fileno()).st_size
+        while remaining > 0:
+            copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+            if copied == 0:
+                break
+            remaining -= copied
+
+
+def place_image_file(source_path: str, target_path: str, link_mode: str = IMAGE_LINK_COPY):
+    """
+    将源图像放置到输出目录
+
+    hardlink失败（跨文件系统等）时依次回退到reflink和普通拷贝，
+    reflink失败时回退到普通拷贝；copy模式保留原文件的时间戳
+
+    Args:
+        source_path: 源图像路径
+        target_path: 目标图像路径
+        link_mode: 放置方式，取值见IMAGE_LINK_MODES
+    """
+    if link_mode == IMAGE_LINK_COPY:
+        shutil.copy2(source_path, target_path)
+        return
+
+    # 链接和copy_file_range不会覆盖已有文件，先删除上次转换的输出
+    if os.path.lexists(target_path):
+        os.remove(target_path)
+
+    if link_mode == IMAGE_LINK_HARDLINK:
+        try:
+            os.link(source_path, target_path)
+            return
+        except OSError:
+            pass
+
+    try:
+        _copy_file_range(source_path, target_path)
+    except OSError:
+        shutil.copyfile(source_path, target_path)
+
+
 class YOLOSeriesDataset:
     """
     YOLO系列数据格式转换器
@@ -36,14 +188,20 @@ class YOLOSeriesDataset:
     输出：YOLO格式数据集 (适用于YOLOv6-YOLOv13)
     """
     
-    def __init__(self, processed_dataset_path: str, annotations_folder_name: str = ANNOTATIONS_OUTPUT_DIR):
+    def __init__(self, processed_dataset_path: str, annotations_folder_name: str = ANNOTATIONS_OUTPUT_DIR,
+                 link_mode: str = IMAGE_LINK_COPY):
         """
         初始化YOLO转换器
         
         Args:
             processed_dataset_path: 已处理的数据集路径
             annotations_folder_name: 标签文件夹名称 (默认: Annotations_clear)
+            link_mode: 输出图像的放置方式 hardlink/reflink/copy (默认: copy)
         """
+        if link_mode not in IMAGE_LINK_MODES:
+            raise ValueError(f"不支持的图像放置方式: {link_mode}，可选: {IMAGE_LINK_MODES}")
+        
+        self.link_mode = link_mode
         self.dataset_path = os.path.abspath(processed_dataset_path)
         self.dataset_name = os.path.basename(os.path.normpath(processed_dataset_path))
         self.annotations_folder_name = annotations_folder_name
@@ -92,17 +250,18 @@ class YOLOSeriesDataset:
         
         # 遍历所有XML文件收集类别
         if os.path.exists(self.annotations_dir):
-            for xml_file in os.listdir(self.annotations_dir):
-                if xml_file.lower().endswith(XML_EXTENSION):
-                    xml_path = os.path.join(self.annotations_dir, xml_file)
+            with os.scandir(self.annotations_dir) as entries:
+                for entry in entries:
+                    if not (entry.name.lower().endswith(XML_EXTENSION) and entry.is_file()):
+                        continue
                     try:
-                        tree = ET.parse(xml_path)
+                        tree = parse_xml(entry.path)
                         root = tree.getroot()
                         for obj in root.findall(XML_OBJECT_TAG):
                             class_name = obj.find(XML_NAME_TAG).text
                             all_classes.add(class_name)
                     except Exception as e:
-                        logger.warning(f"解析XML文件失败: {xml_file}, 错误: {str(e)}")
+                        logger.warning(f"解析XML文件失败: {entry.name}, 错误: {str(e)}")
         
         # 构建映射表
         sorted_classes = sorted(list(all_classes))
@@ -121,54 +280,7 @@ class YOLOSeriesDataset:
             YOLO格式标注行列表
         """
         xml_path = os.path.join(self.annotations_dir, xml_file)
-        
-        try:
-            tree = ET.parse(xml_path)
-            root = tree.getroot()
-            
-            # 获取图像尺寸
-            size = root.find(XML_SIZE_TAG)
-            if size is None:
-                return None
-                
-            img_width = int(size.find(XML_WIDTH_TAG).text)
-            img_height = int(size.find(XML_HEIGHT_TAG).text)
-            
-            yolo_lines = []
-            
-            # 转换每个目标
-            for obj in root.findall(XML_OBJECT_TAG):
-                class_name = obj.find(XML_NAME_TAG).text
-                
-                if class_name not in self.class_to_id:
-                    continue
-                
-                class_id = self.class_to_id[class_name]
-                
-                # 获取边界框
-                bbox = obj.find(XML_BNDBOX_TAG)
-                if bbox is None:
-                    continue
-                
-                xmin = float(bbox.find(XML_XMIN_TAG).text)
-                ymin = float(bbox.find(XML_YMIN_TAG).text)
-                xmax = float(bbox.find(XML_XMAX_TAG).text)
-                ymax = float(bbox.find(XML_YMAX_TAG).text)
-                
-                # 转换为YOLO格式 (归一化的中心点坐标和宽高)
-                center_x = (xmin + xmax) / 2.0 / img_width
-                center_y = (ymin + ymax) / 2.0 / img_height
-                width = (xmax - xmin) / img_width
-                height = (ymax - ymin) / img_height
-                
-                yolo_line = f"{class_id} {center_x:.6f} {center_y:.6f} {width:.6f} {height:.6f}"
-                yolo_lines.append(yolo_line)
-            
-            return yolo_lines
-            
-        except Exception as e:
-            logger.error(f"转换XML文件失败: {xml_file}, 错误: {str(e)}")
-            return None
+        return convert_xml_to_yolo_lines(xml_path, self.class_to_id)
     
     def _parse_split_file(self, split_file_path: str) -> List[str]:
         """
@@ -259,15 +371,14 @@ class YOLOSeriesDataset:
                 logger.warning(f"未找到图像文件: {file_name}")
                 continue
             
-            # 复制图像文件
+            # 放置图像文件（硬链接/reflink/拷贝）
             image_ext = os.path.splitext(source_image_path)[1]
             target_image_path = os.path.join(self.output_images_dir, split_name, f"{file_name}{image_ext}")
-            shutil.copy2(source_image_path, target_image_path)
+            place_image_file(source_image_path, target_image_path, self.link_mode)
             
             # 保存YOLO标注文件
             target_label_path = os.path.join(self.output_labels_dir, split_name, f"{file_name}.txt")
-            with open(target_label_path, 'w', encoding=DEFAULT_ENCODING) as f:
-                f.write(NEWLINE.join(yolo_lines))
+            write_yolo_label_file(target_label_path, yolo_lines)
             
             success_count += 1
         
@@ -323,15 +434,14 @@ class YOLOSeriesDataset:
                 
                 # 收集所有图像文件的相对路径
                 for image_file in sorted(os.listdir(split_images_dir)):
-                    if any(image_file.lower().endswith(ext) for ext in IMAGE_EXTENSIONS):
+                    if file_suffix(image_file) in IMAGE_EXTENSION_SET:
                         # 使用相对路径：./images/train/xxx.jpg
                         relative_image_path = f"./images/{split}/{image_file}"
                         image_paths.append(relative_image_path)
                 
-                # 写入txt文件
-                with open(split_txt_path, 'w', encoding=DEFAULT_ENCODING) as f:
-                    for image_path in image_paths:
-                        f.write(f"{image_path}{NEWLINE}")
+                # 拼接后一次写入txt文件
+                with open(split_txt_path, 'wb') as f:
+                    f.write("".join(f"{image_path}{NEWLINE}" for image_path in image_paths).encode(DEFAULT_ENCODING))
                 
                 logger.info(f"{split}.txt文件已保存: {split_txt_path} ({len(image_paths)} 张图片)")
     
@@ -456,10 +566,10 @@ class YOLOSeriesDataset:
                 labels_dir = os.path.join(self.output_labels_dir, split)
                 
                 if os.path.exists(images_dir):
-                    image_count = len([f for f in os.listdir(images_dir) 
-                                     if any(f.lower().endswith(ext) for ext in IMAGE_EXTENSIONS)])
-                    label_count = len([f for f in os.listdir(labels_dir) 
-                                     if f.lower().endswith('.txt')]) if os.path.exists(labels_dir) else 0
+                    image_count = count_files_with_suffixes(images_dir, IMAGE_EXTENSION_SET)
+                    label_count = 0
+                    if os.path.exists(labels_dir):
+                        label_count = count_files_with_suffixes(labels_dir, {LABEL_EXTENSION})
                     
                     logger.info(f"  {split}集: {image_count} 张图片, {label_count} 个标签文件")
             
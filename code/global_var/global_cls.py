@@ -14,6 +14,8 @@ XML_EXTENSION = ".xml"
 
 # 支持的图像文件扩展名
 IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp', '.svg']
+IMAGE_EXTENSION_SET = frozenset(IMAGE_EXTENSIONS)  # 用于按扩展名O(1)判断
+LABEL_EXTENSION = ".txt"  # YOLO标签文件扩展名
 
 # 数据集划分相关常量 (默认只有训练集和验证集)
 TRAIN_RATIO = 0.85
@@ -50,6 +52,21 @@ TRAIN_COCO_JSON = "train_coco.json"
 VAL_COCO_JSON = "val_coco.json"
 TEST_COCO_JSON = "test_coco.json"
 
+# 缓存文件相关常量
+VOC_PAIRS_CACHE_JSON = ".voc_pairs_cache.json"
+STATS_CACHE_DIR = ".pf_cache"  # 数据集统计缓存目录，文件名为统计缓存键
+
+# XML清洗流水线相关常量
+PIPELINE_READ_WORKERS = 2  # 读取线程数，少量线程近似顺序读取，对机械硬盘友好
+PIPELINE_WRITE_WORKERS = 4
+PIPELINE_QUEUE_SIZE = 128  # 阶段之间队列的最大长度
+
+# 输出图像放置方式相关常量
+IMAGE_LINK_HARDLINK = "hardlink"  # 硬链接，同一文件系统内不拷贝数据
+IMAGE_LINK_REFLINK = "reflink"  # copy_file_range，btrfs/xfs等文件系统上为写时复制
+IMAGE_LINK_COPY = "copy"  # 完整拷贝
+IMAGE_LINK_MODES = (IMAGE_LINK_HARDLINK, IMAGE_LINK_REFLINK, IMAGE_LINK_COPY)
+
 # 图像处理相关常量
 DEFAULT_IMAGE_CHANNELS = 3
 SUPPORTED_IMAGE_CHANNELS = [1, 3, 4]  # 灰度、RGB、RGBA
@@ -0,0 +1 @@
+# 日志模块
\ No newline at end of file
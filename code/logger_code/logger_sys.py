@@ -28,6 +28,9 @@ LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
 LOG_TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
 LOG_FORMAT = '%(asctime)s - %(levelname)s - %(filename)s - %(funcName)s() - %(lineno)d - %(message)s'
 
+# 日志目录 - 当前文件所在目录的上级目录的上级目录（项目根目录）下的logs，模块加载时计算一次
+_LOG_DIR = Path(__file__).resolve().parent.parent.parent / LOG_DIR_NAME
+
 
 class UniversalLogger:
     """通用日志器类 - 可复制到任何项目使用"""
@@ -96,16 +99,13 @@ class UniversalLogger:
     def _setup_logging_config(cls):
         """设置日志配置"""
         # 创建日志目录
-        cls._log_dir = cls._get_log_directory()
+        cls._log_dir = _LOG_DIR
         cls._log_dir.mkdir(exist_ok=True)
     
     @classmethod
     def _get_log_directory(cls):
-        """获取日志目录路径"""
-        # 获取当前文件所在目录的上级目录的上级目录作为基准（项目根目录）
-        current_path = Path(__file__).resolve()
-        base_dir = current_path.parent.parent.parent
-        return base_dir / LOG_DIR_NAME
+        """获取日志目录路径（项目根目录下的logs）"""
+        return _LOG_DIR
     
     @classmethod
     def _get_log_filename(cls):
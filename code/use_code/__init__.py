@@ -0,0 +1 @@
+# 使用示例模块
\ No newline at end of file
@@ -8,30 +8,48 @@ BirdNest数据集一键处理器
 1. 一键清洗BirdNest数据集
 2. 转换为VOC格式并划分数据集 (训练集:验证集:测试集=0.88:0.11:0.01)
 3. 转换为COCO格式
-4. 转换为YOLOv13格式 (使用线程池拷贝图像)
+4. 转换为YOLOv13格式 (使用进程池解析XML，线程池拷贝图像)
 5. 输出到指定路径: D:\WJL\project\BirdNest\BirdNest_yolov13
 """
 
 import os
-import sys
 import shutil
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from typing import List, Optional, Tuple, Dict
 
-# 添加项目路径到系统路径
-sys.path.append(str(Path(__file__).parent.parent))
-
-from dataset_handler.voc_dataset import VOCDataset
-from dataset_handler.yolo_series_dataset import YOLOSeriesDataset
-from logger_code.logger_sys import get_logger
-from global_var.global_cls import *
+# 通过code包导入，在项目根目录下以 python -m code.use_code.birdnest_dataset_processor 运行
+from code.dataset_handler.voc_dataset import VOCDataset
+from code.dataset_handler.yolo_series_dataset import (YOLOSeriesDataset, convert_xml_to_yolo_lines,
+                                                      count_files_with_suffixes)
+from code.logger_code.logger_sys import get_logger
+from code.global_var.global_cls import *
 
 # 获取当前文件名作为日志标识
 current_filename = Path(__file__).stem
 logger = get_logger(current_filename)
 
 
+def _convert_xml_to_yolo_worker(task: Tuple[str, str, Dict[str, int]]) -> Optional[bytes]:
+    """
+    进程池工作函数：转换单个XML标注为YOLO格式
+    
+    顶层函数以便被进程池序列化，只接收最小必要状态
+    
+    Args:
+        task: (标注目录, XML文件名, 类别映射表)
+        
+    Returns:
+        已编码的YOLO标签文件内容，转换失败时返回None
+    """
+    annotations_dir, xml_file, class_to_id = task
+    yolo_lines = convert_xml_to_yolo_lines(os.path.join(annotations_dir, xml_file), class_to_id)
+    if yolo_lines is None:
+        return None
+    # 在解析阶段一次性拼接并编码，写文件时只做二进制写入
+    return NEWLINE.join(yolo_lines).encode(DEFAULT_ENCODING)
+
+
 class BirdNestDatasetProcessor:
     """
     BirdNest数据集一键处理器
@@ -40,14 +58,19 @@ class BirdNestDatasetProcessor:
     1. VOC格式清洗和数据集划分
     2. COCO格式转换
     3. YOLOv13格式转换（多线程拷贝图像）
+    
+    作为上下文管理器使用，退出时关闭线程池和进程池：
+        with BirdNestDatasetProcessor() as processor:
+            processor.process_complete_pipeline()
     """
     
-    def __init__(self, dataset_path: str = r"D:\WJL\project\BirdNest"):
+    def __init__(self, dataset_path: str = r"D:\WJL\project\BirdNest", max_workers: Optional[int] = None):
         """
         初始化BirdNest数据集处理器
         
         Args:
             dataset_path: BirdNest数据集路径
+            max_workers: 图像拷贝线程池大小（默认按CPU核数的4倍，上限64）
         """
         self.dataset_path = os.path.abspath(dataset_path)
         self.dataset_name = os.path.basename(os.path.normpath(dataset_path))
@@ -60,20 +83,30 @@ class BirdNestDatasetProcessor:
         self.val_ratio = 0.11
         self.test_ratio = 0.01
         
-        # 线程池 - 用于多线程拷贝图像
-        self.max_workers = min(32, (os.cpu_count() or 1) + 4)
+        # 线程池 - 用于多线程拷贝图像（纯IO任务，线程数可远超CPU核数）
+        self.max_workers = max_workers or min(64, (os.cpu_count() or 4) * 4)
         self.thread_pool = ThreadPoolExecutor(max_workers=self.max_workers)
         
+        # 进程池 - 用于并行解析XML（CPU密集型，绕开GIL）
+        self.xml_workers = os.cpu_count() or 1
+        self.xml_pool = ProcessPoolExecutor(max_workers=self.xml_workers)
+        
         logger.info(f"初始化BirdNest数据集处理器")
         logger.info(f"数据集路径: {self.dataset_path}")
         logger.info(f"YOLOv13输出路径: {self.yolo_output_path}")
         logger.info(f"数据集划分比例 - 训练集:{self.train_ratio}, 验证集:{self.val_ratio}, 测试集:{self.test_ratio}")
         logger.info(f"线程池大小: {self.max_workers}")
+        logger.info(f"XML解析进程池大小: {self.xml_workers}")
     
-    def __del__(self):
-        """析构函数，关闭线程池"""
-        if hasattr(self, 'thread_pool'):
-            self.thread_pool.shutdown(wait=True)
+    def __enter__(self):
+        """进入上下文，返回处理器自身"""
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        """退出上下文，统一关闭线程池和进程池"""
+        self.thread_pool.shutdown(wait=True)
+        self.xml_pool.shutdown(wait=True)
+        return False
     
     def _validate_dataset_path(self) -> bool:
         """
@@ -143,7 +176,9 @@ class BirdNestDatasetProcessor:
             yolo_converter = CustomYOLOConverter(
                 dataset_path=self.dataset_path,
                 output_path=self.yolo_output_path,
-                thread_pool=self.thread_pool
+                thread_pool=self.thread_pool,
+                xml_pool=self.xml_pool,
+                max_pending=self.max_workers * 2
             )
             
             # 执行转换
@@ -200,18 +235,15 @@ class BirdNestDatasetProcessor:
         except Exception as e:
             logger.error(f"完整处理流程异常: {str(e)}")
             return False
-        finally:
-            # 确保线程池关闭
-            self.thread_pool.shutdown(wait=True)
     
     def _print_processing_summary(self):
         """打印处理结果摘要"""
         try:
             logger.info("处理结果摘要:")
-            logger.info(f"  数据集名称: {self.dataset_name}")
-            logger.info(f"  原始数据路径: {self.dataset_path}")
-            logger.info(f"  YOLOv13输出路径: {self.yolo_output_path}")
-            logger.info(f"  数据集划分比例: 训练集{self.train_ratio}, 验证集{self.val_ratio}, 测试集{self.test_ratio}")
+            logger.info("  数据集名称: %s", self.dataset_name)
+            logger.info("  原始数据路径: %s", self.dataset_path)
+            logger.info("  YOLOv13输出路径: %s", self.yolo_output_path)
+            logger.info("  数据集划分比例: 训练集%s, 验证集%s, 测试集%s", self.train_ratio, self.val_ratio, self.test_ratio)
             
             # 统计处理后的文件数量
             if os.path.exists(self.yolo_output_path):
@@ -220,15 +252,15 @@ class BirdNestDatasetProcessor:
                     labels_dir = os.path.join(self.yolo_output_path, 'labels', split)
                     
                     if os.path.exists(images_dir):
-                        image_count = len([f for f in os.listdir(images_dir) 
-                                         if any(f.lower().endswith(ext) for ext in IMAGE_EXTENSIONS)])
-                        label_count = len([f for f in os.listdir(labels_dir) 
-                                         if f.lower().endswith('.txt')]) if os.path.exists(labels_dir) else 0
+                        image_count = count_files_with_suffixes(images_dir, IMAGE_EXTENSION_SET)
+                        label_count = 0
+                        if os.path.exists(labels_dir):
+                            label_count = count_files_with_suffixes(labels_dir, {LABEL_EXTENSION})
                         
-                        logger.info(f"  {split}集: {image_count} 张图片, {label_count} 个标签文件")
+                        logger.info("  %s集: %s 张图片, %s 个标签文件", split, image_count, label_count)
             
         except Exception as e:
-            logger.error(f"打印摘要失败: {str(e)}")
+            logger.error("打印摘要失败: %s", e)
 
 
 class CustomYOLOConverter(YOLOSeriesDataset):
@@ -237,12 +269,13 @@ class CustomYOLOConverter(YOLOSeriesDataset):
     
     扩展YOLOSeriesDataset以支持：
     1. 自定义输出路径
-    2. 多线程拷贝图像
+    2. 多进程解析XML、多线程拷贝图像
     3. 相对路径和COCO格式yml文件
     """
     
     def __init__(self, dataset_path: str, output_path: str, thread_pool: ThreadPoolExecutor, 
-                 annotations_folder_name: str = ANNOTATIONS_OUTPUT_DIR):
+                 annotations_folder_name: str = ANNOTATIONS_OUTPUT_DIR,
+                 xml_pool: Optional[ProcessPoolExecutor] = None, max_pending: int = 128):
         """
         初始化自定义YOLO转换器
         
@@ -251,6 +284,8 @@ class CustomYOLOConverter(YOLOSeriesDataset):
             output_path: 自定义输出路径
             thread_pool: 线程池
             annotations_folder_name: 标签文件夹名称
+            xml_pool: XML解析进程池（为None时在当前进程顺序解析）
+            max_pending: 线程池中在途的拷贝任务上限
         """
         # 调用父类初始化
         super().__init__(dataset_path, annotations_folder_name)
@@ -260,153 +295,220 @@ class CustomYOLOConverter(YOLOSeriesDataset):
         self.output_images_dir = os.path.join(self.output_dir, "images")
         self.output_labels_dir = os.path.join(self.output_dir, "labels")
         
-        # 线程池
+        # 线程池和进程池
         self.thread_pool = thread_pool
+        self.xml_pool = xml_pool
+        self.max_pending = max_pending
+        
+        # 一次性准备的缓存（图像索引和划分文件），由_prepare_once填充
+        self._stem_to_path = None
+        self._split_files = None
         
         logger.info(f"自定义YOLO转换器初始化完成")
         logger.info(f"输出路径: {self.output_dir}")
     
-    def _copy_image_file(self, source_path: str, target_path: str) -> bool:
+    def _copy_image_file(self, source_path: str, target_path: str):
         """
         拷贝单个图像文件（线程安全）
         
+        只拷贝文件内容，不保留原文件的时间戳和权限，
+        输出的YOLO数据集作为派生产物使用新的时间戳
+        
         Args:
             source_path: 源文件路径
             target_path: 目标文件路径
             
-        Returns:
-            拷贝是否成功
+        Raises:
+            OSError: 拷贝失败时抛出，由调用方通过future.result()处理
         """
-        try:
-            # 确保目标目录存在
-            os.makedirs(os.path.dirname(target_path), exist_ok=True)
-            
-            # 拷贝文件
-            shutil.copy2(source_path, target_path)
-            return True
-            
-        except Exception as e:
-            logger.error(f"拷贝图像文件失败: {source_path} -> {target_path}, 错误: {str(e)}")
-            return False
+        # 确保目标目录存在
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        
+        # 拷贝文件内容（省去copystat的额外系统调用）
+        shutil.copyfile(source_path, target_path)
     
-    def _process_split(self, split_name: str):
+    def _prepare_once(self):
         """
-        处理单个数据集划分（重写以支持多线程拷贝）
+        一次性扫描图像目录并解析所有划分文件
         
-        Args:
-            split_name: 划分名称 (train/val/test)
+        各个划分共享同一份图像索引和划分文件列表，避免每个划分重复遍历目录
         """
-        # 构建划分文件路径
-        if split_name == "train":
-            split_file = os.path.join(self.imagesets_dir, TRAIN_TXT)
-        elif split_name == "val":
-            split_file = os.path.join(self.imagesets_dir, VAL_TXT)
-        elif split_name == "test":
-            split_file = os.path.join(self.imagesets_dir, TEST_TXT)
-        else:
-            logger.error(f"不支持的划分类型: {split_name}")
+        if self._stem_to_path is not None:
             return
         
-        if not os.path.exists(split_file):
-            logger.warning(f"划分文件不存在: {split_file}")
-            return
+        # 扫描图像目录，按IMAGE_EXTENSIONS的优先顺序为每个文件名选取图像（扩展名不区分大小写）
+        ext_priority = {ext: index for index, ext in enumerate(IMAGE_EXTENSIONS)}
+        stem_to_path = {}
+        stem_priority = {}
+        if os.path.exists(self.images_dir):
+            with os.scandir(self.images_dir) as entries:
+                for entry in entries:
+                    stem, ext = os.path.splitext(entry.name)
+                    priority = ext_priority.get(ext.lower())
+                    if priority is None or not entry.is_file():
+                        continue
+                    if stem not in stem_priority or priority < stem_priority[stem]:
+                        stem_priority[stem] = priority
+                        stem_to_path[stem] = entry.path
+        self._stem_to_path = stem_to_path
         
-        # 解析文件列表
-        file_names = self._parse_split_file(split_file)
-        
-        logger.info(f"处理 {split_name} 数据集: {len(file_names)} 个文件")
+        # 解析所有存在的划分文件
+        self._split_files = {}
+        for split_name, split_txt in (("train", TRAIN_TXT), ("val", VAL_TXT), ("test", TEST_TXT)):
+            split_file = os.path.join(self.imagesets_dir, split_txt)
+            if os.path.exists(split_file):
+                self._split_files[split_name] = self._parse_split_file(split_file)
+    
+    def _iter_split_tasks(self, split_name: str, file_names: List[str], pbar):
+        """
+        逐个产出划分中每个文件的拷贝和写标签任务
         
-        # 准备拷贝任务列表
-        copy_tasks = []
-        label_tasks = []
+        XML由进程池并行解析，结果按原顺序逐个产出，无需等待全部解析完成
         
-        for file_name in file_names:
-            # 转换XML标注
-            xml_file = f"{file_name}{XML_EXTENSION}"
-            yolo_lines = self._convert_xml_to_yolo(xml_file)
+        Args:
+            split_name: 划分名称 (train/val/test)
+            file_names: 划分中的文件名列表
+            pbar: 进度条，跳过的文件在此处计入进度
             
-            if yolo_lines is None or len(yolo_lines) == 0:
-                logger.warning(f"跳过无效文件: {file_name}")
+        Yields:
+            (源图像路径, 目标图像路径, 目标标签路径, 已编码的标签内容)
+        """
+        xml_tasks = [(self.annotations_dir, f"{file_name}{XML_EXTENSION}", self.class_to_id)
+                     for file_name in file_names]
+        if self.xml_pool is not None:
+            yolo_bytes_iter = self.xml_pool.map(_convert_xml_to_yolo_worker, xml_tasks, chunksize=16)
+        else:
+            yolo_bytes_iter = map(_convert_xml_to_yolo_worker, xml_tasks)
+        
+        for file_name, yolo_bytes in zip(file_names, yolo_bytes_iter):
+            if not yolo_bytes:
+                logger.warning("跳过无效文件: %s", file_name)
+                pbar.update(1)
                 continue
             
-            # 查找对应的图像文件
-            source_image_path = None
-            
-            for ext in IMAGE_EXTENSIONS:
-                potential_path = os.path.join(self.images_dir, f"{file_name}{ext}")
-                if os.path.exists(potential_path):
-                    source_image_path = potential_path
-                    break
+            # 从图像索引中查找对应的图像文件
+            source_image_path = self._stem_to_path.get(file_name)
             
             if not source_image_path:
-                logger.warning(f"未找到图像文件: {file_name}")
+                logger.warning("未找到图像文件: %s", file_name)
+                pbar.update(1)
                 continue
             
-            # 准备拷贝任务
             image_ext = os.path.splitext(source_image_path)[1]
             target_image_path = os.path.join(self.output_images_dir, split_name, f"{file_name}{image_ext}")
-            copy_tasks.append((source_image_path, target_image_path))
-            
-            # 准备标签任务
             target_label_path = os.path.join(self.output_labels_dir, split_name, f"{file_name}.txt")
-            label_tasks.append((target_label_path, yolo_lines))
-        
-        # 使用线程池并发拷贝图像文件
-        logger.info(f"使用线程池拷贝 {len(copy_tasks)} 个图像文件...")
+            yield source_image_path, target_image_path, target_label_path, yolo_bytes
+    
+    def _copy_and_write(self, task: Tuple[str, str, str, bytes]):
+        """
+        拷贝单个图像并写入对应的YOLO标签文件（线程安全）
         
-        from tqdm import tqdm
+        Args:
+            task: (源图像路径, 目标图像路径, 目标标签路径, 已编码的标签内容)
+            
+        Raises:
+            OSError: 拷贝或写入失败时抛出
+        """
+        source_image_path, target_image_path, target_label_path, yolo_bytes = task
+        self._copy_image_file(source_image_path, target_image_path)
         
-        # 提交拷贝任务到线程池
-        copy_futures = []
-        for source_path, target_path in copy_tasks:
-            future = self.thread_pool.submit(self._copy_image_file, source_path, target_path)
-            copy_futures.append(future)
+        # 确保目标目录存在
+        os.makedirs(os.path.dirname(target_label_path), exist_ok=True)
+        with open(target_label_path, 'wb') as f:
+            f.write(yolo_bytes)
+    
+    def _collect_done(self, done, pending: dict, pbar) -> int:
+        """
+        收集已完成的任务结果并从在途任务中移除
         
-        # 等待所有拷贝任务完成并显示进度
+        Args:
+            done: 已完成的future可迭代对象
+            pending: 在途任务字典 {future: task}
+            pbar: 进度条
+            
+        Returns:
+            成功完成的任务数
+        """
         success_count = 0
-        for future in tqdm(copy_futures, desc=f"拷贝{split_name}图像"):
-            if future.result():
+        for future in done:
+            source_image_path, target_image_path, target_label_path, _ = pending.pop(future)
+            try:
+                future.result()
                 success_count += 1
+            except Exception as e:
+                logger.error("拷贝图像或保存标签失败: %s -> %s, %s, 错误: %s",
+                             source_image_path, target_image_path, target_label_path, e)
+            pbar.update(1)
+        return success_count
+    
+    def _process_split(self, split_name: str):
+        """
+        处理单个数据集划分（重写以支持多线程拷贝）
         
-        # 保存标签文件（单线程，因为文件较小）
-        logger.info(f"保存 {len(label_tasks)} 个标签文件...")
-        for target_label_path, yolo_lines in tqdm(label_tasks, desc=f"保存{split_name}标签"):
-            try:
-                # 确保目标目录存在
-                os.makedirs(os.path.dirname(target_label_path), exist_ok=True)
+        Args:
+            split_name: 划分名称 (train/val/test)
+        """
+        if split_name not in ("train", "val", "test"):
+            logger.error("不支持的划分类型: %s", split_name)
+            return
+        
+        self._prepare_once()
+        
+        # 从缓存中获取文件列表
+        file_names = self._split_files.get(split_name)
+        if file_names is None:
+            logger.warning("划分文件不存在: %s", split_name)
+            return
+        
+        logger.info("处理 %s 数据集: %s 个文件", split_name, len(file_names))
+        
+        from tqdm import tqdm
+        
+        # 流水线：XML解析结果一产出就提交拷贝和写标签任务，解析与IO重叠进行
+        pending = {}
+        success_count = 0
+        task_count = 0
+        
+        with tqdm(total=len(file_names), desc=f"处理{split_name}数据") as pbar:
+            for task in self._iter_split_tasks(split_name, file_names, pbar):
+                future = self.thread_pool.submit(self._copy_and_write, task)
+                pending[future] = task
+                task_count += 1
                 
-                with open(target_label_path, 'w', encoding=DEFAULT_ENCODING) as f:
-                    f.write(NEWLINE.join(yolo_lines))
-            except Exception as e:
-                logger.error(f"保存标签文件失败: {target_label_path}, 错误: {str(e)}")
+                # 限制在途任务数量，满时等待至少一个任务完成
+                if len(pending) >= self.max_pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    success_count += self._collect_done(done, pending, pbar)
+            
+            # 等待剩余任务完成
+            success_count += self._collect_done(as_completed(pending), pending, pbar)
         
-        logger.info(f"{split_name} 数据集处理完成: {success_count}/{len(copy_tasks)} 个图像文件成功拷贝")
+        logger.info("%s 数据集处理完成: %s/%s 个图像文件成功拷贝", split_name, success_count, task_count)
 
 
 def main():
     """主函数"""
     try:
-        # 创建BirdNest数据集处理器
-        processor = BirdNestDatasetProcessor()
-        
-        # 执行完整处理流程
-        success = processor.process_complete_pipeline()
-        
-        if success:
-            print("\n" + "=" * 60)
-            print("🎉 BirdNest数据集处理完成！")
-            print("=" * 60)
-            print(f"📁 YOLOv13格式数据集已保存到: {processor.yolo_output_path}")
-            print("📊 数据集划分比例: 训练集88%, 验证集11%, 测试集1%")
-            print("✅ 包含VOC格式清洗、COCO格式转换、YOLOv13格式转换")
-            print("🚀 可直接用于YOLOv13模型训练！")
-            print("=" * 60)
-        else:
-            print("\n" + "=" * 60)
-            print("❌ BirdNest数据集处理失败！")
-            print("=" * 60)
-            print("请检查日志文件获取详细错误信息")
-            print("=" * 60)
+        # 创建BirdNest数据集处理器（退出上下文时关闭线程池和进程池）
+        with BirdNestDatasetProcessor() as processor:
+            # 执行完整处理流程
+            success = processor.process_complete_pipeline()
+            
+            if success:
+                print("\n" + "=" * 60)
+                print("🎉 BirdNest数据集处理完成！")
+                print("=" * 60)
+                print(f"📁 YOLOv13格式数据集已保存到: {processor.yolo_output_path}")
+                print("📊 数据集划分比例: 训练集88%, 验证集11%, 测试集1%")
+                print("✅ 包含VOC格式清洗、COCO格式转换、YOLOv13格式转换")
+                print("🚀 可直接用于YOLOv13模型训练！")
+                print("=" * 60)
+            else:
+                print("\n" + "=" * 60)
+                print("❌ BirdNest数据集处理失败！")
+                print("=" * 60)
+                print("请检查日志文件获取详细错误信息")
+                print("=" * 60)
     
     except KeyboardInterrupt:
         print("\n用户中断处理流程")
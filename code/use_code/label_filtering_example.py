@@ -7,15 +7,191 @@
 
 import os
 import sys
+import argparse
 
-# 添加项目根目录到Python路径
+# 项目根目录，用于定位示例数据集；脚本通过code包导入，在项目根目录下以 python -m code.use_code.label_filtering_example 运行
 project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-sys.path.insert(0, project_root)
 
-from code.dataset_handler.voc_dataset import VOCDataset
+from code.dataset_handler.voc_dataset import VOCDataset, metadata_fingerprint
+from code.dataset_handler.yolo_series_dataset import file_suffix
+from code.global_var.global_cls import *
+
+# 处理结果标记文件，第一行记录生成输出时的输入状态和筛选条件，第二行记录输出文件的状态
+STAMP_FILE_NAME = ".stamp"
+
+# 默认要处理的类别
+DEFAULT_TARGET_LABELS = ['pineapple', 'snake fruit']
+
+# 筛选方式对应的说明文字：(标题, 初始化说明, 结果说明)
+MODE_TEXTS = {
+    'include': ("选择方式1: 只保留 {labels} 类别", "只保留{labels}", "只保留了 {labels} 类别的数据"),
+    'exclude': ("选择方式2: 排除 {labels} 类别", "排除{labels}", "保留了除 {labels} 外的所有类别"),
+}
+
+
+def _scan_metadata(dir_path, suffixes):
+    """单次os.scandir遍历，返回扩展名（不区分大小写）在suffixes中的文件按文件名排序的(文件名, 大小, 纳秒修改时间)"""
+    entries = []
+    with os.scandir(dir_path) as it:
+        for entry in it:
+            if file_suffix(entry.name) in suffixes and entry.is_file():
+                stat = entry.stat()
+                entries.append((entry.name, stat.st_size, stat.st_mtime_ns))
+    entries.sort()
+    return entries
+
+
+def _compute_stamp(dataset_path, mode, labels):
+    """
+    根据输入标注目录、图像目录和筛选条件计算标记内容
+
+    一键转换的结果同时取决于标注和图像（文件对匹配需要图像，尺寸修正会修改图像），
+    两个目录分别与VOCDataset的目录指纹使用同一算法（metadata_fingerprint），筛选条件作为标注指纹的前缀；
+    只读取元数据，不读取文件内容；任一文件增删、改名或修改，以及筛选条件变化时标记随之变化
+
+    Args:
+        dataset_path: 数据集路径
+        mode: 筛选方式（include/exclude）
+        labels: 筛选的类别
+
+    Returns:
+        (XML文件数, 标记内容)
+    """
+    xml_entries = _scan_metadata(os.path.join(dataset_path, ANNOTATIONS_DIR), {'.xml'})
+    images_dir = os.path.join(dataset_path, JPEGS_DIR)
+    image_entries = _scan_metadata(images_dir, IMAGE_EXTENSION_SET) if os.path.isdir(images_dir) else []
+    prefix = f"{mode}:{','.join(sorted(labels))}".encode('utf-8') + b'\0'
+    stamp = f"{metadata_fingerprint(xml_entries, prefix)}:{metadata_fingerprint(image_entries)}"
+    return len(xml_entries), stamp
+
+
+def _compute_output_stamp(dataset_path):
+    """
+    计算一键转换输出的标记内容
+
+    分别对清洗后的XML、划分文件和COCO文件的元数据计算指纹，任一输出文件被删除、新增或修改时标记随之变化
+
+    Args:
+        dataset_path: 数据集路径
+
+    Returns:
+        输出标记内容
+    """
+    annotations_clear_dir = os.path.join(dataset_path, ANNOTATIONS_OUTPUT_DIR)
+    imagesets_dir = os.path.join(dataset_path, IMAGESETS_DIR, MAIN_DIR)
+    clear_entries = (_scan_metadata(annotations_clear_dir, {XML_EXTENSION})
+                     if os.path.isdir(annotations_clear_dir) else [])
+    split_entries = _scan_metadata(imagesets_dir, {'.txt'}) if os.path.isdir(imagesets_dir) else []
+    coco_entries = [entry for entry in _scan_metadata(dataset_path, {'.json'}) if entry[0].endswith('_coco.json')]
+    return ":".join(metadata_fingerprint(entries) for entries in (clear_entries, split_entries, coco_entries))
+
+
+def _read_stamp(output_dir):
+    """读取输出目录中的标记文件，返回(输入标记, 输出标记)，不存在时返回(None, None)"""
+    stamp_file = os.path.join(output_dir, STAMP_FILE_NAME)
+    if not os.path.exists(stamp_file):
+        return None, None
+    with open(stamp_file, 'r', encoding='utf-8') as f:
+        lines = [line.strip() for line in f if line.strip()]
+    return (lines[0], lines[1]) if len(lines) >= 2 else (None, None)
+
+
+def _write_stamp(output_dir, stamp, output_stamp):
+    """处理成功后写入标记文件"""
+    with open(os.path.join(output_dir, STAMP_FILE_NAME), 'w', encoding='utf-8') as f:
+        f.write(f"{stamp}\n{output_stamp}\n")
+
+
+def _is_up_to_date(dataset_path, output_dir, stamp):
+    """输入和筛选条件与上次处理时一致，且输出文件（含清洗后的XML）未被删除或修改时，输出才是最新的"""
+    saved_stamp, saved_output_stamp = _read_stamp(output_dir)
+    if saved_stamp != stamp:
+        return False
+    return saved_output_stamp == _compute_output_stamp(dataset_path)
+
+
+def _run_label_filter(dataset_path, mode, target_labels, skip_confirmation, stamp):
+    """
+    按筛选方式执行一键转换并报告结果，成功后写入处理结果标记
+
+    Args:
+        dataset_path: 数据集路径
+        mode: 筛选方式（include/exclude）
+        target_labels: 筛选的类别
+        skip_confirmation: 是否跳过数据集备份确认
+        stamp: 处理前计算的输入标记，为None时不写入标记
+    """
+    title, condition, summary = MODE_TEXTS[mode]
+    labels_param = f"{mode}_labels"
+    annotations_clear_dir = os.path.join(dataset_path, ANNOTATIONS_OUTPUT_DIR)
+    
+    print(f"\n📋 {title.format(labels=target_labels)}")
+    print("-" * 40)
+    
+    try:
+        # 初始化数据集处理器 - 按筛选方式传入include_labels或exclude_labels；
+        # 一键转换结束后会关闭实例的线程池并切换标注目录，实例只能使用一次
+        # 线程数按CPU核数自动调整（IO与计算交错，取2倍核数），可通过环境变量VOC_WORKERS覆盖
+        default_workers = min(32, (os.cpu_count() or 4) * 2)
+        max_workers = int(os.environ.get('VOC_WORKERS', default_workers))
+        dataset = VOCDataset(
+            dataset_path=dataset_path,
+            train_ratio=0.8,
+            val_ratio=0.2,
+            test_ratio=0.0,
+            max_workers=max_workers,
+            **{labels_param: frozenset(target_labels)}
+        )
+        
+        print(f"✅ 数据集初始化完成 ({condition.format(labels=target_labels)})")
+        print(f"📊 筛选条件: {labels_param}={target_labels}")
+        print()
+        
+        # 执行一键转换
+        print("🚀 开始处理...")
+        result = dataset.one_click_complete_conversion(skip_confirmation=skip_confirmation)
+        
+        if not result.get("success", False):
+            print(f"❌ 处理失败: {result.get('message', '未知错误')}")
+            return
+        
+        print("✅ 处理完成!")
+        print(f"📊 处理结果: {summary.format(labels=target_labels)}")
+        
+        # 验证输出的标注文件夹
+        if os.path.exists(annotations_clear_dir):
+            if stamp:
+                # 尺寸修正可能修改了图像，按处理后的输入重新计算标记
+                _write_stamp(annotations_clear_dir, _compute_stamp(dataset_path, mode, target_labels)[1],
+                             _compute_output_stamp(dataset_path))
+            with os.scandir(annotations_clear_dir) as entries:
+                xml_count = sum(1 for e in entries if e.name.endswith('.xml') and e.is_file())
+            print(f"📁 清洗后的XML文件数量: {xml_count} 个")
+            print(f"📂 清洗输出目录: {annotations_clear_dir}")
+        
+    except (OSError, ValueError) as e:
+        print(f"❌ 执行出错: {str(e)}")
+
+
+def parse_args():
+    """解析命令行参数，提供参数时无需交互输入，便于批量运行和计时"""
+    parser = argparse.ArgumentParser(description="标签过滤功能演示")
+    parser.add_argument('--choice', choices=['1', '2'],
+                        help="筛选方式：1 只保留指定类别，2 排除指定类别")
+    parser.add_argument('--labels', nargs='+', default=DEFAULT_TARGET_LABELS,
+                        help=f"要处理的类别 (默认: {DEFAULT_TARGET_LABELS})")
+    parser.add_argument('--yes', action='store_true',
+                        help="跳过数据集备份确认")
+    return parser.parse_args()
+
 
 def main():
     """标签过滤功能演示"""
+    args = parse_args()
+    
+    # 非交互环境（标准输入不是终端）下不等待输入，默认选择方式1并跳过确认
+    interactive = sys.stdin.isatty()
+    skip_confirmation = args.yes or not interactive
     
     # 数据集路径
     dataset_path = os.path.join(project_root, "dataset", "Fruit")
@@ -30,94 +206,35 @@ def main():
     print("1. 只保留指定类别 (include_labels)")
     print("2. 排除指定类别 (exclude_labels)")
     
-    choice = input("请输入选择 (1 或 2): ").strip()
+    if args.choice:
+        choice = args.choice
+    elif interactive:
+        choice = input("请输入选择 (1 或 2): ").strip()
+    else:
+        choice = '1'
     
     # 指定要处理的类别
-    target_labels = ['pineapple', 'snake fruit']
+    target_labels = args.labels
     
-    if choice == '1':
-        print(f"\n📋 选择方式1: 只保留 {target_labels} 类别")
-        print("-" * 40)
-        
-        try:
-            # 初始化数据集处理器 - 只保留指定类别
-            dataset = VOCDataset(
-                dataset_path=dataset_path,
-                train_ratio=0.8,
-                val_ratio=0.2,
-                test_ratio=0.0,
-                max_workers=4,
-                include_labels=target_labels  # 只保留指定类别
-            )
-            
-            print(f"✅ 数据集初始化完成 (只保留{target_labels})")
-            print(f"📊 筛选条件: include_labels={target_labels}")
-            print()
-            
-            # 执行一键转换
-            print("🚀 开始处理...")
-            result = dataset.one_click_complete_conversion()
-            
-            if result.get("success", False):
-                print("✅ 处理完成!")
-                print(f"📊 处理结果: 只保留了 {target_labels} 类别的数据")
-                
-                # 验证输出的标注文件夹
-                annotations_clear_dir = os.path.join(dataset_path, "Annotations_clear")
-                if os.path.exists(annotations_clear_dir):
-                    xml_files = [f for f in os.listdir(annotations_clear_dir) if f.endswith('.xml')]
-                    print(f"📁 清洗后的XML文件数量: {len(xml_files)} 个")
-                    print(f"📂 清洗输出目录: {annotations_clear_dir}")
-                
-            else:
-                print(f"❌ 处理失败: {result.get('message', '未知错误')}")
-                
-        except Exception as e:
-            print(f"❌ 执行出错: {str(e)}")
-    
-    elif choice == '2':
-        print(f"\n📋 选择方式2: 排除 {target_labels} 类别")
-        print("-" * 40)
-        
-        try:
-            # 初始化数据集处理器 - 排除指定类别
-            dataset = VOCDataset(
-                dataset_path=dataset_path,
-                train_ratio=0.8,
-                val_ratio=0.2,
-                test_ratio=0.0,
-                max_workers=4,
-                exclude_labels=target_labels  # 排除指定类别
-            )
-            
-            print(f"✅ 数据集初始化完成 (排除{target_labels})")
-            print(f"📊 筛选条件: exclude_labels={target_labels}")
-            print()
-            
-            # 执行一键转换
-            print("🚀 开始处理...")
-            result = dataset.one_click_complete_conversion()
-            
-            if result.get("success", False):
-                print("✅ 处理完成!")
-                print(f"📊 处理结果: 保留了除 {target_labels} 外的所有类别")
-                
-                # 验证输出的标注文件夹
-                annotations_clear_dir = os.path.join(dataset_path, "Annotations_clear")
-                if os.path.exists(annotations_clear_dir):
-                    xml_files = [f for f in os.listdir(annotations_clear_dir) if f.endswith('.xml')]
-                    print(f"📁 清洗后的XML文件数量: {len(xml_files)} 个")
-                    print(f"📂 清洗输出目录: {annotations_clear_dir}")
-                
-            else:
-                print(f"❌ 处理失败: {result.get('message', '未知错误')}")
-                
-        except Exception as e:
-            print(f"❌ 执行出错: {str(e)}")
-    
-    else:
+    if choice not in ('1', '2'):
         print("❌ 无效选择，请输入 1 或 2")
         return
+    mode = 'include' if choice == '1' else 'exclude'
+    
+    # 输入标注为空，或输入和筛选条件与上次处理时一致且输出完整，则直接跳过
+    annotations_dir = os.path.join(dataset_path, ANNOTATIONS_DIR)
+    annotations_clear_dir = os.path.join(dataset_path, ANNOTATIONS_OUTPUT_DIR)
+    stamp = None
+    if os.path.isdir(annotations_dir):
+        xml_count, stamp = _compute_stamp(dataset_path, mode, target_labels)
+        if xml_count == 0:
+            print(f"⚠️  标注目录中没有XML文件，无需处理: {annotations_dir}")
+            return
+        if _is_up_to_date(dataset_path, annotations_clear_dir, stamp):
+            print(f"✅ 输出已是最新，跳过处理: {annotations_clear_dir}")
+            return
+    
+    _run_label_filter(dataset_path, mode, target_labels, skip_confirmation, stamp)
     
     print("\n" + "🎉 标签过滤功能演示完成!")
     print("=" * 60)
@@ -128,5 +245,6 @@ def main():
     print("   - 清洗后的XML文件保存在 Annotations_clear 目录中")
     print("   - 详细日志请查看日志文件")
 
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -6,14 +6,15 @@
 """
 
 import os
-import sys
 
-# 添加项目根目录到Python路径
+# 项目根目录，用于定位示例数据集；脚本通过code包导入，在项目根目录下以 python -m code.use_code.simple_process_example 运行
 project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-sys.path.insert(0, project_root)
 
 from code.dataset_handler.voc_dataset import VOCDataset
 
+# 设置环境变量VOC_TRACE=1时才在异常时输出完整堆栈
+VERBOSE = bool(int(os.environ.get('VOC_TRACE', '0')))
+
 
 def main():
     """
@@ -34,12 +35,15 @@ def main():
     try:
         # 3. 初始化VOC数据集处理器
         print("\n🔧 初始化数据集处理器...")
+        # 线程数按CPU核数自动调整（IO与计算交错，取2倍核数），可通过环境变量VOC_WORKERS覆盖
+        default_workers = min(32, (os.cpu_count() or 4) * 2)
+        max_workers = int(os.environ.get('VOC_WORKERS', default_workers))
         dataset = VOCDataset(
             dataset_path=dataset_path,
             train_ratio=0.8,      # 训练集比例
             val_ratio=0.1,        # 验证集比例
             test_ratio=0.1,       # 测试集比例
-            max_workers=4         # 线程池大小
+            max_workers=max_workers  # 线程池大小
         )
         
         print(f"✅ 数据集初始化完成: {dataset.dataset_name}")
@@ -58,10 +62,14 @@ def main():
         print("     * train_coco.json")
         print("     * val_coco.json")
         
-    except Exception as e:
+    except (OSError, ValueError) as e:
+        # 只处理数据集缺失、参数错误等预期错误，其他异常带完整堆栈直接抛出
         print(f"❌ 处理过程中出现错误: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        if VERBOSE:
+            import traceback
+            traceback.print_exc()
+        else:
+            print("  (设置环境变量 VOC_TRACE=1 可查看完整堆栈)")
 
 
 if __name__ == "__main__":
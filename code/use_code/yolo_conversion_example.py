@@ -25,12 +25,15 @@ YOLO系列数据格式转换示例
 import os
 import sys
 
-# 添加项目根目录到Python路径
+# 项目根目录，用于定位示例数据集；脚本通过code包导入，在项目根目录下以 python -m code.use_code.yolo_conversion_example 运行
 current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(os.path.dirname(current_dir))
-sys.path.insert(0, project_root)
 
-from code.dataset_handler.yolo_series_dataset import YOLOSeriesDataset
+from code.dataset_handler.yolo_series_dataset import YOLOSeriesDataset, count_files_with_suffixes
+from code.global_var.global_cls import *
+
+# 设置环境变量VOC_TRACE=1时才在异常时输出完整堆栈
+VERBOSE = bool(int(os.environ.get('VOC_TRACE', '0')))
 
 
 def main():
@@ -67,7 +70,8 @@ def main():
         # 创建YOLO转换器
         yolo_converter = YOLOSeriesDataset(
             processed_dataset_path=processed_dataset_path,
-            annotations_folder_name="Annotations_clear"
+            annotations_folder_name="Annotations_clear",
+            link_mode="hardlink"  # 同一文件系统内硬链接图像，失败时自动回退到拷贝
         )
         
         print("\n开始转换为YOLO格式...")
@@ -90,10 +94,14 @@ def main():
         else:
             print("\nYOLO格式转换失败，请检查日志信息")
     
-    except Exception as e:
+    except (OSError, ValueError) as e:
+        # 只处理数据集缺失、参数错误等预期错误，其他异常带完整堆栈直接抛出
         print(f"程序执行出错: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        if VERBOSE:
+            import traceback
+            traceback.print_exc()
+        else:
+            print("  (设置环境变量 VOC_TRACE=1 可查看完整堆栈)")
 
 
 def verify_conversion_result(output_dir):
@@ -117,66 +125,69 @@ def verify_conversion_result(output_dir):
             print("  ❌ labels目录不存在")
             return
         
-        print("  ✅ 目录结构正确")
+        # 验证信息先收集再一次性输出，减少控制台写入次数
+        lines = ["  ✅ 目录结构正确"]
+        
+        # 各划分的图像和标签目录只拼接一次，统计和抽样检查共用
+        split_paths = [(split, os.path.join(images_dir, split), os.path.join(labels_dir, split))
+                       for split in ('train', 'val', 'test')]
+        existing_label_dirs = []
         
         # 统计各个划分的文件数量
-        splits = ['train', 'val', 'test']
         total_images = 0
         total_labels = 0
         
-        for split in splits:
-            split_images_dir = os.path.join(images_dir, split)
-            split_labels_dir = os.path.join(labels_dir, split)
+        for split, split_images_dir, split_labels_dir in split_paths:
+            has_labels = os.path.isdir(split_labels_dir)
+            if has_labels:
+                existing_label_dirs.append(split_labels_dir)
             
             if os.path.exists(split_images_dir):
-                image_files = [f for f in os.listdir(split_images_dir) 
-                             if f.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp'))]
-                image_count = len(image_files)
+                image_count = count_files_with_suffixes(split_images_dir, IMAGE_EXTENSION_SET)
                 total_images += image_count
                 
-                label_files = [f for f in os.listdir(split_labels_dir) 
-                             if f.lower().endswith('.txt')] if os.path.exists(split_labels_dir) else []
-                label_count = len(label_files)
+                label_count = count_files_with_suffixes(split_labels_dir, {LABEL_EXTENSION}) if has_labels else 0
                 total_labels += label_count
                 
-                print(f"  {split}集: {image_count} 张图片, {label_count} 个标签文件")
+                lines.append(f"  {split}集: {image_count} 张图片, {label_count} 个标签文件")
         
-        print(f"  总计: {total_images} 张图片, {total_labels} 个标签文件")
+        lines.append(f"  总计: {total_images} 张图片, {total_labels} 个标签文件")
         
         # 检查配置文件
-        yaml_files = [f for f in os.listdir(output_dir) if f.endswith('.yaml')]
+        with os.scandir(output_dir) as entries:
+            yaml_files = [e.name for e in entries if e.name.endswith('.yaml') and e.is_file()]
         if yaml_files:
-            print(f"  ✅ 配置文件: {yaml_files[0]}")
+            lines.append(f"  ✅ 配置文件: {yaml_files[0]}")
         else:
-            print("  ❌ 未找到YAML配置文件")
+            lines.append("  ❌ 未找到YAML配置文件")
         
         # 检查标签文件格式
         sample_label_file = None
-        for split in splits:
-            split_labels_dir = os.path.join(labels_dir, split)
-            if os.path.exists(split_labels_dir):
-                label_files = [f for f in os.listdir(split_labels_dir) if f.endswith('.txt')]
-                if label_files:
-                    sample_label_file = os.path.join(split_labels_dir, label_files[0])
-                    break
+        for split_labels_dir in existing_label_dirs:
+            with os.scandir(split_labels_dir) as entries:
+                sample_entry = next((e for e in entries if e.name.endswith('.txt') and e.is_file()), None)
+            if sample_entry is not None:
+                sample_label_file = sample_entry.path
+                break
         
         if sample_label_file and os.path.exists(sample_label_file):
             with open(sample_label_file, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-                if lines:
-                    sample_line = lines[0].strip()
+                first_line = f.readline()
+                if first_line:
+                    sample_line = first_line.strip()
                     parts = sample_line.split()
                     if len(parts) == 5:
-                        print(f"  ✅ 标签格式正确: {sample_line}")
+                        lines.append(f"  ✅ 标签格式正确: {sample_line}")
                     else:
-                        print(f"  ❌ 标签格式错误: {sample_line}")
+                        lines.append(f"  ❌ 标签格式错误: {sample_line}")
         
-        print("\n使用说明:")
-        print("1. 将输出文件夹复制到YOLO训练环境")
-        print("2. 使用.yaml配置文件进行模型训练")
-        print("3. 标签格式: class_id center_x center_y width height (归一化坐标)")
+        lines.append("\n使用说明:")
+        lines.append("1. 将输出文件夹复制到YOLO训练环境")
+        lines.append("2. 使用.yaml配置文件进行模型训练")
+        lines.append("3. 标签格式: class_id center_x center_y width height (归一化坐标)")
+        sys.stdout.write("\n".join(lines) + "\n")
         
-    except Exception as e:
+    except OSError as e:
         print(f"验证转换结果时出错: {str(e)}")
 
 